@@ -0,0 +1,302 @@
+"""
+Benchmarks for the degrees search.
+
+Usage: python benchmark.py search [directory] [--pairs N]
+       python benchmark.py frontier [--sizes N ...]
+       python benchmark.py compact [directory] [--pairs N]
+       python benchmark.py landmarks [directory] [--pairs N] [--count N]
+       python benchmark.py names [directory] [--queries N]
+
+`directory` defaults to "synthetic". If it has no CSV files yet, a
+synthetic dataset is written there first so the benchmark can run
+without the IMDB dump; pass "large" to benchmark the real data.
+"""
+
+import argparse
+import csv
+import os
+import random
+import time
+import tracemalloc
+
+import degrees
+from graph import CompactGraph
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+from util import Node, StackFrontier, QueueFrontier
+
+
+SYLLABLES = ["ka", "ren", "lo", "mi", "tha", "dor", "el", "su", "vin", "ar", "bel", "chi",
+             "fa", "gor", "is", "jo", "ne", "pa", "ros", "ta", "ul", "wen", "ya", "zo"]
+
+
+def random_name(rng):
+    """
+    Returns a made-up "First Last" name built from random syllables.
+    """
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(2)
+    )
+
+
+def generate_dataset(directory, n_people=20000, n_movies=8000, cast_size=4, seed=0):
+    """
+    Write people.csv, movies.csv and stars.csv with a random cast
+    for every movie, in the same layout as the IMDB data.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(n_people):
+            writer.writerow([i, random_name(rng), 1900 + rng.randrange(100)])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(n_movies):
+            writer.writerow([i, f"Movie {i}", 1920 + rng.randrange(100)])
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(n_movies):
+            for person in rng.sample(range(n_people), cast_size):
+                writer.writerow([person, movie])
+
+
+def random_pairs(count, seed=0):
+    """
+    Returns `count` random (source, target) pairs of loaded person ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(count)]
+
+
+def compare_search(pairs):
+    """
+    Runs single-sided and bidirectional BFS on every pair and returns
+    the total expansions and seconds spent by each.
+    """
+    results = {}
+    for bidirectional in (False, True):
+        expanded = 0
+        start = time.perf_counter()
+        for source, target in pairs:
+            stats = {}
+            degrees.shortest_path(source, target, bidirectional=bidirectional, stats=stats)
+            expanded += stats["expanded"]
+        results[bidirectional] = (expanded, time.perf_counter() - start)
+    return results
+
+
+def time_frontier(frontier_class, size):
+    """
+    Returns the seconds taken to add, look up and remove `size` nodes.
+    """
+    nodes = [Node(i, None, None) for i in range(size)]
+    frontier = frontier_class()
+
+    start = time.perf_counter()
+    for node in nodes:
+        frontier.add(node)
+    added = time.perf_counter()
+    for i in range(size):
+        frontier.contains_state(i)
+    looked_up = time.perf_counter()
+    while not frontier.empty():
+        frontier.remove()
+    removed = time.perf_counter()
+
+    return added - start, looked_up - added, removed - looked_up
+
+
+def ensure_dataset(directory):
+    """
+    Generate a synthetic dataset in `directory` unless it already has one.
+    """
+    if not os.path.exists(os.path.join(directory, "people.csv")):
+        print(f"Writing synthetic dataset to {directory}...")
+        generate_dataset(directory)
+
+
+def load(directory):
+    """
+    Load `directory` into degrees, generating a synthetic dataset first if needed.
+    """
+    ensure_dataset(directory)
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+
+def benchmark_search(args):
+    load(args.directory)
+    count = args.pairs
+    pairs = random_pairs(count)
+    results = compare_search(pairs)
+    print(f"Search over {count} random pairs")
+    for bidirectional, label in ((False, "single-sided"), (True, "bidirectional")):
+        expanded, seconds = results[bidirectional]
+        print(f"  {label:>13}: {expanded / count:10.1f} expansions/query, "
+              f"{seconds / count * 1000:8.3f} ms/query")
+    print(f"Co-star cache: {degrees.costar_cache.info()}")
+
+
+def benchmark_compact(args):
+    ensure_dataset(args.directory)
+
+    tracemalloc.start()
+    degrees.load_data(args.directory)
+    # count only people, movies and names: drop the indexes load_data built
+    degrees.name_index = None
+    degrees.components.clear()
+    degrees.component_sizes.clear()
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    compact = CompactGraph.from_dicts(degrees.people, degrees.movies)
+    compact_bytes = tracemalloc.get_traced_memory()[0] - dict_bytes
+    tracemalloc.stop()
+    degrees.index_data()
+
+    print("Memory footprint")
+    print(f"  {'dicts':>13}: {dict_bytes / 2 ** 20:8.1f} MiB")
+    print(f"  {'compact':>13}: {compact_bytes / 2 ** 20:8.1f} MiB "
+          f"({compact.nbytes() / 2 ** 20:.1f} MiB of CSR arrays)")
+
+    pairs = random_pairs(args.pairs)
+    start = time.perf_counter()
+    for source, target in pairs:
+        degrees.bidirectional_shortest_path(source, target)
+    dict_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for source, target in pairs:
+        compact.shortest_path(compact.person_index[source], compact.person_index[target])
+    compact_seconds = time.perf_counter() - start
+
+    print(f"Bidirectional search over {args.pairs} random pairs (ms/query)")
+    print(f"  {'dicts':>13}: {dict_seconds / args.pairs * 1000:8.3f}")
+    print(f"  {'compact':>13}: {compact_seconds / args.pairs * 1000:8.3f}")
+
+
+def benchmark_landmarks(args):
+    load(args.directory)
+    compact = CompactGraph.from_dicts(degrees.people, degrees.movies)
+
+    start = time.perf_counter()
+    index = LandmarkIndex.build(compact, args.count)
+    print(f"Built {len(index.landmarks)} landmarks in {time.perf_counter() - start:.2f}s")
+
+    pairs = [
+        (compact.person_index[source], compact.person_index[target])
+        for source, target in random_pairs(args.pairs)
+    ]
+    results = {}
+    for label, search in (
+        ("bidirectional", compact.shortest_path),
+        ("landmark A*", lambda s, t, stats: index.shortest_path(compact, s, t, stats, astar=True)),
+        ("pruned bidir", lambda s, t, stats: index.shortest_path(compact, s, t, stats)),
+    ):
+        lengths = []
+        expanded = 0
+        start = time.perf_counter()
+        for source, target in pairs:
+            stats = {}
+            path = search(source, target, stats)
+            lengths.append(None if path is None else len(path))
+            expanded += stats["expanded"]
+        results[label] = (lengths, expanded, time.perf_counter() - start)
+
+    if any(lengths != results["bidirectional"][0] for lengths, _, _ in results.values()):
+        print("  warning: path lengths differ between searches")
+    separated = sum(index.separated(source, target) for source, target in pairs)
+    print(f"Search over {args.pairs} random pairs "
+          f"({separated} answered 'not connected' from the index)")
+    for label, (_, expanded, seconds) in results.items():
+        print(f"  {label:>13}: {expanded / args.pairs:10.1f} expansions/query, "
+              f"{seconds / args.pairs * 1000:8.3f} ms/query")
+    for label in ("landmark A*", "pruned bidir"):
+        speedup = results["bidirectional"][2] / results[label][2]
+        print(f"  {label} speedup: {speedup:.2f}x")
+
+
+def misspell(name, rng):
+    """
+    Returns `name` with one random character dropped, doubled or swapped.
+    """
+    i = rng.randrange(len(name) - 1)
+    edit = rng.choice(("drop", "double", "swap"))
+    if edit == "drop":
+        return name[:i] + name[i + 1:]
+    if edit == "double":
+        return name[:i] + name[i] + name[i:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def benchmark_names(args):
+    load(args.directory)
+    start = time.perf_counter()
+    index = NameIndex(degrees.names)
+    print(f"Indexed {len(index)} names in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(0)
+    sample = rng.sample(index.names, min(args.queries, len(index)))
+    for label, queries, lookup in (
+        ("prefix", [name[:max(1, len(name) // 2)] for name in sample], index.prefix),
+        ("typo search", [misspell(name, rng) for name in sample], index.search),
+    ):
+        start = time.perf_counter()
+        for query in queries:
+            lookup(query)
+        seconds = time.perf_counter() - start
+        print(f"  {label:>13}: {seconds / len(queries) * 1000:8.3f} ms/query")
+
+
+def benchmark_frontier(args):
+    print("Frontier operations (ns/op)")
+    for size in args.sizes:
+        for frontier_class in (StackFrontier, QueueFrontier):
+            timings = time_frontier(frontier_class, size)
+            add, contains, remove = (seconds / size * 1e9 for seconds in timings)
+            print(f"  {frontier_class.__name__:>13} n={size:<8} "
+                  f"add {add:7.1f}  contains {contains:7.1f}  remove {remove:7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for degrees.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="single-sided vs bidirectional BFS")
+    search.add_argument("directory", nargs="?", default="synthetic")
+    search.add_argument("--pairs", type=int, default=100)
+    search.set_defaults(run=benchmark_search)
+
+    frontier = commands.add_parser("frontier", help="frontier add/contains/remove")
+    frontier.add_argument("--sizes", type=int, nargs="+", default=[10 ** 5, 10 ** 6])
+    frontier.set_defaults(run=benchmark_frontier)
+
+    compact = commands.add_parser("compact", help="dict vs compact graph memory and latency")
+    compact.add_argument("directory", nargs="?", default="synthetic")
+    compact.add_argument("--pairs", type=int, default=1000)
+    compact.set_defaults(run=benchmark_compact)
+
+    landmarks = commands.add_parser("landmarks", help="bidirectional BFS vs landmark A*")
+    landmarks.add_argument("directory", nargs="?", default="synthetic")
+    landmarks.add_argument("--pairs", type=int, default=10000)
+    landmarks.add_argument("--count", type=int, default=16)
+    landmarks.set_defaults(run=benchmark_landmarks)
+
+    names = commands.add_parser("names", help="prefix and fuzzy name lookups")
+    names.add_argument("directory", nargs="?", default="synthetic")
+    names.add_argument("--queries", type=int, default=1000)
+    names.set_defaults(run=benchmark_names)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,22 @@
+import argparse
 import csv
+import gc
+import heapq
+import itertools
+import json
+import os
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+import server
+import snapshot as snapshots
+from graph import CompactGraph, bidirectional_search, distance_histogram
+from landmarks import LandmarkIndex
+from nameindex import NameIndex
+from util import DisjointSet, LatencyStats, LRUCache, Node, StackFrontier, QueueFrontier
+
+# Number of people whose co-stars are kept in `costar_cache`
+COSTAR_CACHE_SIZE = 65536
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +27,53 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Maps person_ids to the label of their connected component
+components = {}
+
+# Number of people in each component, indexed by label
+component_sizes = []
+
+# Optional CompactGraph over people and movies, used by shortest_path when loaded
+graph = None
+
+# Optional LandmarkIndex over `graph`, whose A* search shortest_path uses when loaded
+landmark_index = None
+
+# NameIndex over the keys of `names`, built by load_data
+name_index = None
+
+# Recently used results of `costars`
+costar_cache = LRUCache(COSTAR_CACHE_SIZE)
 
-def load_data(directory):
+# Optional results of `costars` for everyone, filled by build_costar_table
+costar_table = {}
+
+
+def load_data(directory, compact=False, snapshot=False, precompute_costars=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is set, also build a CompactGraph for searching.
+    If `precompute_costars` is set, fill `costar_table` for everyone.
+
+    If `snapshot` is set, the data is read from a binary snapshot in
+    `directory` when one exists for the current CSV files, and a new
+    snapshot is written after parsing the CSV files otherwise. Snapshots
+    always load a CompactGraph.
     """
+    global graph, landmark_index
+
+    landmark_index = None
+    costar_cache.clear()
+    costar_table.clear()
+    if snapshot:
+        path = os.path.join(directory, snapshots.FILENAME)
+        loaded = snapshots.read_snapshot(path, directory)
+        if loaded is not None:
+            load_snapshot(*loaded)
+            index_data(precompute_costars)
+            return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,16 +108,187 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    index_data(precompute_costars)
+    graph = CompactGraph.from_dicts(people, movies) if compact or snapshot else None
 
-def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    if snapshot:
+        try:
+            snapshots.write_snapshot(path, directory, graph, people, movies)
+        except OSError:
+            pass  # a read-only data directory just means no cache
+
+
+def index_data(precompute_costars=False):
+    """
+    Build the indexes every load needs: components, the name index and,
+    if asked for, the co-star table.
+    """
+    global name_index
+
+    label_components()
+    name_index = NameIndex(names)
+    if precompute_costars:
+        build_costar_table()
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+
+def build_costar_table():
+    """
+    Fill `costar_table` with the result of `costars` for every person.
+    """
+    costar_table.clear()
+    for person_id in people:
+        costar_table[person_id] = _find_costars(person_id)
+
+
+def label_components():
+    """
+    Label every person with their connected component, using union-find
+    over the stars of each movie, and count the people in each component.
+    """
+    person_ids = list(people)
+    index = {person_id: i for i, person_id in enumerate(person_ids)}
+    sets = DisjointSet(len(person_ids))
+    for movie in movies.values():
+        stars = [index[person_id] for person_id in movie["stars"]]
+        for star in stars[1:]:
+            sets.union(stars[0], star)
+
+    labels = {}
+    components.clear()
+    component_sizes.clear()
+    for i, person_id in enumerate(person_ids):
+        root = sets.find(i)
+        if root not in labels:
+            labels[root] = len(component_sizes)
+            component_sizes.append(sets.size[root])
+        components[person_id] = labels[root]
+
+
+def component_stats():
+    """
+    Returns a summary of component sizes: the number of components, the
+    largest size and its share of all people, the number of people with
+    no co-stars, and how many components there are of each size.
+    """
+    if not component_sizes:
+        return {"components": 0}
+    histogram = {}
+    for size in component_sizes:
+        histogram[size] = histogram.get(size, 0) + 1
+    largest = max(component_sizes)
+    return {
+        "components": len(component_sizes),
+        "people": len(components),
+        "largest": largest,
+        "largest_share": largest / len(components),
+        "singletons": histogram.get(1, 0),
+        "sizes": dict(sorted(histogram.items(), reverse=True)),
+    }
+
+
+def load_landmarks(path):
+    """
+    Load a landmark index built by landmarks.py for the loaded CompactGraph.
+    """
+    global landmark_index
+
+    index = LandmarkIndex.load(path)
+    if graph is None or not index.matches(graph):
+        raise ValueError(f"{path} was not built for the loaded graph")
+    landmark_index = index
+
+
+def load_snapshot(compact, tables):
+    """
+    Fill `names`, `people` and `movies` from the tables of a snapshot
+    and use its CompactGraph for searching.
+    """
+    global graph
+
+    # nothing built here is garbage, so skip collector passes while filling
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        _fill_from_snapshot(compact, tables)
+    finally:
+        if collecting:
+            gc.enable()
+
+    graph = compact
+
+
+def _fill_from_snapshot(compact, tables):
+    person_ids, person_names, births, movie_ids, titles, years = tables
+    person_offsets, person_movies = compact.person_offsets, compact.person_movies
+    movie_offsets, movie_stars = compact.movie_offsets, compact.movie_stars
+
+    for i, (movie_id, title, year) in enumerate(zip(movie_ids, titles, years)):
+        stars = movie_stars[movie_offsets[i]:movie_offsets[i + 1]]
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set(map(person_ids.__getitem__, stars))
+        }
+    for i, (person_id, name, birth) in enumerate(zip(person_ids, person_names, births)):
+        starred = person_movies[person_offsets[i]:person_offsets[i + 1]]
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set(map(movie_ids.__getitem__, starred))
+        }
+        key = name.lower()
+        if key not in names:
+            names[key] = {person_id}
+        else:
+            names[key].add(person_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python degrees.py [directory] [--compact] [--snapshot] [--landmarks FILE] "
+              "[--batch FILE | --serve PORT [--workers N] | --components]"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="search on a compact integer-indexed graph")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="cache the parsed data in a binary snapshot")
+    parser.add_argument("--landmarks", metavar="FILE",
+                        help="search with landmark A* using an index from landmarks.py")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--batch", metavar="FILE",
+                      help="answer tab-separated name pairs from FILE ('-' for stdin) as JSON lines")
+    mode.add_argument("--serve", metavar="PORT", type=int,
+                      help="answer queries over HTTP on localhost:PORT")
+    mode.add_argument("--components", action="store_true",
+                      help="print connected component statistics as JSON")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="worker threads for --serve")
+    args = parser.parse_args()
+
+    # Load data from files into memory; in batch mode stdout carries the results
+    log = sys.stderr if args.batch else sys.stdout
+    print("Loading data...", file=log)
+    load_data(args.directory, compact=args.compact or bool(args.landmarks),
+              snapshot=args.snapshot)
+    if args.landmarks:
+        load_landmarks(args.landmarks)
+    print("Data loaded.", file=log)
+
+    if args.components:
+        print(json.dumps(component_stats()))
+        return
+    if args.batch:
+        if args.batch == "-":
+            stats = run_batch(sys.stdin, sys.stdout)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                stats = run_batch(f, sys.stdout)
+        print(json.dumps(stats.summary()), file=sys.stderr)
+        return
+    if args.serve is not None:
+        server.serve(args.serve, answer_query, args.workers)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -84,14 +312,108 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def answer_query(source_name, target_name):
+    """
+    Returns a JSON-ready dictionary answering a query between two names.
+
+    Unknown or ambiguous names are reported under "error" instead of
+    prompting, with the matching people listed under "candidates".
+    """
+    result = {"source": source_name, "target": target_name}
+    person_ids = []
+    for name in (source_name, target_name):
+        matches = sorted(names.get(name.lower(), set()))
+        if len(matches) == 0:
+            result["error"] = f"Person not found: {name}"
+            result["suggestions"] = [
+                people[min(names[key])]["name"] for key in name_index.search(name, 5)
+            ]
+            return result
+        elif len(matches) > 1:
+            result["error"] = f"Ambiguous name: {name}"
+            result["candidates"] = [
+                {"id": person_id, "name": people[person_id]["name"],
+                 "birth": people[person_id]["birth"]}
+                for person_id in matches
+            ]
+            return result
+        person_ids.append(matches[0])
+
+    path = shortest_path(*person_ids)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie_id": movie_id, "movie": movies[movie_id]["title"],
+             "person_id": person_id, "person": people[person_id]["name"]}
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+def run_batch(lines, output):
+    """
+    Answers one tab-separated "source<TAB>target" pair per line of
+    `lines`, writing one JSON object per query to `output`.
+
+    Returns the LatencyStats of the queries.
+    """
+    stats = LatencyStats()
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        start = time.perf_counter()
+        pair = line.split("\t")
+        if len(pair) != 2:
+            result = {"line": line, "error": "Expected two tab-separated names"}
+        else:
+            result = answer_query(pair[0].strip(), pair[1].strip())
+        elapsed = time.perf_counter() - start
+        stats.record(elapsed)
+        result["elapsed_ms"] = round(elapsed * 1000, 3)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+    return stats
+
+
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    With `bidirectional` set, the search grows frontiers from both ends
+    (see `bidirectional_shortest_path`). If a CompactGraph was loaded, the
+    bidirectional search runs on it instead of the dicts. If a landmark
+    index was loaded as well, an A* search guided by its distances runs
+    instead (see `LandmarkIndex.shortest_path`).
+
+    If `stats` is a dictionary, the number of expanded people is stored
+    under "expanded".
+
+    People in different components are answered without searching.
     """
 
+    if components and components[source] != components[target]:
+        if stats is not None:
+            stats["expanded"] = 0
+        return None
+    if graph is not None:
+        source_index, target_index = graph.person_index[source], graph.person_index[target]
+        if landmark_index is not None:
+            path = landmark_index.shortest_path(
+                graph, source_index, target_index, stats, astar=True
+            )
+        else:
+            path = graph.shortest_path(source_index, target_index, stats)
+        return None if path is None else graph.path_ids(path)
+    if bidirectional:
+        return bidirectional_shortest_path(source, target, stats)
+
     queue = QueueFrontier()  # queue
     visited = set()  # set for all the nodes which have been visited
     foundactornodes = set()  # set for all the actors which will have been discovered
@@ -103,6 +425,7 @@ def shortest_path(source, target):
     queue.add(start_node)  # adding it to queue
 
     neighbours = set()  # making a set for all the neighbours that will be returned
+    expanded = 0  # number of people whose neighbours were looked up
 
     while not queue.empty():  # will stop running if the queue get empty meaning ther is no connection
 
@@ -118,9 +441,12 @@ def shortest_path(source, target):
                 if current_node.parent == None:
                     break
 
+            if stats is not None:
+                stats["expanded"] = expanded
             return short_path[::-1]  # to reverse the path
         elif current_node.state not in visited:  # will check if the node was visited before
-            neighbours = neighbors_for_person(current_node.state)
+            neighbours = costars(current_node.state)
+            expanded += 1
             for movie, actor in neighbours:
                 # will check if the actor has been visited or was alreasy discovered
                 if (actor in visited) or (queue.contains_state(actor)) or (actor in foundactornodes):
@@ -132,17 +458,186 @@ def shortest_path(source, target):
 
         visited.add(current_node.state)  # adding the processed actor to the visited
 
+    if stats is not None:
+        stats["expanded"] = expanded
     return None  # if the loop ends meaning there is no connection
 
 
-def person_id_for_name(name):
+def bidirectional_shortest_path(source, target, stats=None):
+    """
+    Returns the same path as `shortest_path`, searching from both ends
+    over `costars` with `graph.bidirectional_search`.
+    """
+    return bidirectional_search(source, target, costars, stats)
+
+
+def distances_from(person_id):
+    """
+    Returns the degrees of separation from a person to everyone, as a
+    bytearray indexed like `graph.person_ids` (see CompactGraph.distances).
+
+    Requires data loaded with a CompactGraph.
+    """
+    if graph is None:
+        raise ValueError("distances_from needs load_data(..., compact=True)")
+    return graph.distances(graph.person_index[person_id])
+
+
+def separation_histogram(person_id):
+    """
+    Returns {degrees: number of people} for everyone connected to a person.
+    """
+    return distance_histogram(distances_from(person_id))
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connects the source to the target, one path at a time.
+
+    A BFS from the source records, for each person, every (movie_id,
+    person_id) step that reaches them from the previous layer, stopping
+    after the layer that contains the target. Paths are then read off
+    this predecessor DAG backwards from the target, so they are produced
+    lazily and never all held in memory.
+    """
+    if source == target:
+        yield []
+        return
+    if components and components[source] != components[target]:
+        return
+
+    depth = {source: 0}
+    predecessors = {source: []}
+    layer = [source]
+    while layer and target not in depth:
+        next_layer = []
+        for person in layer:
+            for movie, actor in neighbors_for_person(person):
+                if actor not in depth:
+                    depth[actor] = depth[person] + 1
+                    predecessors[actor] = []
+                    next_layer.append(actor)
+                if depth[actor] == depth[person] + 1:
+                    predecessors[actor].append((movie, person))
+        layer = next_layer
+    if target not in depth:
+        return
+
+    # depth-first walk back from the target; `path` holds the steps taken so far
+    path = []
+    stack = [(target, iter(predecessors[target]))]
+    while stack:
+        person, options = stack[-1]
+        step = next(options, None)
+        if step is None:
+            stack.pop()
+            if path:
+                path.pop()
+            continue
+        movie, previous = step
+        path.append((movie, person))
+        if previous == source:
+            yield path[::-1]
+            path.pop()
+        else:
+            stack.append((previous, iter(predecessors[previous])))
+
+
+def k_shortest_paths(source, target, k):
+    """
+    Returns an iterator over the `k` shortest paths from the source to
+    the target that never visit a person twice, in order of length.
+    """
+    return itertools.islice(shortest_simple_paths(source, target), k)
+
+
+def shortest_simple_paths(source, target):
+    """
+    Yields paths from the source to the target that never visit a person
+    twice, shortest first, using Yen's algorithm.
+
+    Paths that star the same people through different movies count as
+    different paths, as they do for `neighbors_for_person`.
+    """
+    first = _restricted_path(source, target, set(), set())
+    if first is None:
+        return
+    found = [first]
+    yield first
+
+    candidates = []
+    seen = {tuple(first)}
+    counter = itertools.count()
+    while True:
+        last = found[-1]
+        people_on_path = [source] + [person for _, person in last]
+        for i in range(len(last)):
+            spur = people_on_path[i]
+            root = last[:i]
+            # forbid the steps taken from the spur by paths sharing this root
+            banned_steps = {
+                (spur, path[i][0], path[i][1])
+                for path in found
+                if len(path) > i and path[:i] == root
+            }
+            banned_people = set(people_on_path[:i])
+            spur_path = _restricted_path(spur, target, banned_people, banned_steps)
+            if spur_path is None:
+                continue
+            candidate = root + spur_path
+            if tuple(candidate) not in seen:
+                seen.add(tuple(candidate))
+                heapq.heappush(candidates, (len(candidate), next(counter), candidate))
+
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+        yield path
+
+
+def _restricted_path(source, target, banned_people, banned_steps):
+    """
+    Returns a shortest path from the source to the target that avoids
+    `banned_people` and the (person_id, movie_id, person_id) steps in
+    `banned_steps`, or None if there is none.
+    """
+    parents = {source: None}
+    queue = QueueFrontier()
+    queue.add(Node(source, None, None))
+    while not queue.empty():
+        person = queue.remove().state
+        if person == target:
+            path = []
+            while parents[person] is not None:
+                movie, previous = parents[person]
+                path.append((movie, person))
+                person = previous
+            return path[::-1]
+        for movie, actor in neighbors_for_person(person):
+            if actor in parents or actor in banned_people:
+                continue
+            if (person, movie, actor) in banned_steps:
+                continue
+            parents[actor] = (movie, person)
+            queue.add(Node(actor, None, None))
+    return None
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    Ambiguities are resolved by asking on stdin, or with `rank_candidates`
+    if `interactive` is False.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
+    elif len(person_ids) > 1 and not interactive:
+        return rank_candidates(person_ids)[0]
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
@@ -161,6 +656,43 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def rank_candidates(person_ids, by="movies"):
+    """
+    Returns person_ids ordered from most to least likely intended.
+
+    By "movies", people in more movies come first. By "birth", earlier
+    birth years come first and unknown years last. Ties keep id order.
+    """
+    if by == "movies":
+        def key(person_id):
+            return -len(people[person_id]["movies"])
+    elif by == "birth":
+        def key(person_id):
+            birth = people[person_id]["birth"]
+            return int(birth) if birth.isdigit() else float("inf")
+    else:
+        raise ValueError(f"cannot rank candidates by {by!r}")
+    return sorted(sorted(person_ids), key=key)
+
+
+def resolve_name(name, by="movies"):
+    """
+    Returns the most likely person_id for a possibly misspelt or
+    partial name without prompting, or None if nothing is close.
+
+    Exact matches win; otherwise the best match from the name index is
+    used. Several people with the chosen name are ordered by
+    `rank_candidates`.
+    """
+    person_ids = names.get(name.lower())
+    if not person_ids:
+        matches = name_index.search(name, 1)
+        if not matches:
+            return None
+        person_ids = names[matches[0]]
+    return rank_candidates(person_ids, by)[0]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
@@ -174,5 +706,32 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def costars(person_id):
+    """
+    Returns (movie_id, person_id) pairs for people who starred with a
+    given person, with one movie per co-star and without the person.
+
+    Results come from `costar_table` if it was built, and otherwise from
+    `costar_cache`, which counts its hits and misses.
+    """
+    if costar_table:
+        return costar_table[person_id]
+    result = costar_cache.get(person_id)
+    if result is None:
+        result = _find_costars(person_id)
+        costar_cache.put(person_id, result)
+    return result
+
+
+def _find_costars(person_id):
+    # keep the lowest movie_id for each co-star so results are repeatable
+    first_movie = {}
+    for movie_id in people[person_id]["movies"]:
+        for star in movies[movie_id]["stars"]:
+            if star != person_id and (star not in first_movie or movie_id < first_movie[star]):
+                first_movie[star] = movie_id
+    return tuple((movie_id, star) for star, movie_id in first_movie.items())
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+"""
+Degrees-of-separation distributions for many seed people at once.
+
+Usage: python distribution.py [directory] [--random N | --names NAME ...]
+                              [--workers N] [--snapshot]
+
+The CSR arrays of the CompactGraph are copied once into shared memory
+and every worker process runs single-source BFS over the same read-only
+copy, so the graph is never pickled per task.
+"""
+
+import argparse
+import json
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from graph import CompactGraph, distance_histogram
+
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_stars")
+
+# The graph each worker process searches, attached by _attach
+_worker_graph = None
+_worker_memory = []
+
+
+def _attach(blocks, people, movies):
+    """
+    Pool initializer: rebuild a CompactGraph over the shared memory blocks.
+    """
+    global _worker_graph
+
+    views = []
+    for name, length in blocks:
+        memory = shared_memory.SharedMemory(name=name)
+        _worker_memory.append(memory)
+        views.append(memory.buf[:length * array("I").itemsize].cast("I"))
+    _worker_graph = CompactGraph(range(people), range(movies), *views)
+
+
+def _histogram(seed):
+    return seed, distance_histogram(_worker_graph.distances(seed))
+
+
+def separation_histograms(graph, seeds, workers=None):
+    """
+    Returns ({seed: histogram}, combined histogram) for the seed person
+    indexes in `seeds`, where a histogram maps degrees to a number of people.
+
+    With `workers` of 1 the searches run in this process; otherwise they
+    are spread over a process pool sharing one copy of the graph.
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        results = {seed: distance_histogram(graph.distances(seed)) for seed in seeds}
+    else:
+        results = _pool_histograms(graph, seeds, workers)
+
+    combined = {}
+    for histogram in results.values():
+        for degrees, count in histogram.items():
+            combined[degrees] = combined.get(degrees, 0) + count
+    return results, dict(sorted(combined.items()))
+
+
+def _pool_histograms(graph, seeds, workers):
+    blocks = []
+    memory = []
+    try:
+        for name in ARRAYS:
+            data = array("I", getattr(graph, name))
+            block = shared_memory.SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+            memory.append(block)
+            block.buf[:len(data) * data.itemsize] = data.tobytes()
+            blocks.append((block.name, len(data)))
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            initargs=(blocks, len(graph), len(graph.movie_ids)),
+        ) as pool:
+            chunksize = max(1, len(seeds) // (workers * 4))
+            return dict(pool.map(_histogram, seeds, chunksize=chunksize))
+    finally:
+        for block in memory:
+            block.close()
+            block.unlink()
+
+
+def main():
+    import degrees
+
+    parser = argparse.ArgumentParser(description="Degrees of separation distributions")
+    parser.add_argument("directory", nargs="?", default="large")
+    seeds = parser.add_mutually_exclusive_group()
+    seeds.add_argument("--random", type=int, default=100, metavar="N",
+                       help="use N random seed people (default)")
+    seeds.add_argument("--names", nargs="+", metavar="NAME",
+                       help="use these people as seeds")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="cache the parsed data in a binary snapshot")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True, snapshot=args.snapshot)
+    print("Data loaded.")
+    graph = degrees.graph
+
+    if args.names:
+        person_ids = [degrees.person_id_for_name(name) for name in args.names]
+        if None in person_ids:
+            raise SystemExit("Person not found.")
+        seeds = [graph.person_index[person_id] for person_id in person_ids]
+    else:
+        seeds = random.Random(0).sample(range(len(graph)), min(args.random, len(graph)))
+
+    per_seed, combined = separation_histograms(graph, seeds, args.workers)
+    if args.names:
+        for name, seed in zip(args.names, seeds):
+            print(f"{name}: {json.dumps(per_seed[seed])}")
+    print(f"All {len(seeds)} seeds: {json.dumps(combined)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+from array import array
+from collections import Counter
+from functools import cached_property
+
+# Distance value used for people that cannot be reached
+UNREACHABLE = 255
+
+
+def distance_histogram(distances):
+    """
+    Returns {degrees: number of people} for a distance array from
+    CompactGraph.distances, leaving out the source and unreachable people.
+    """
+    counts = Counter(distances)
+    return {d: counts[d] for d in sorted(counts) if 0 < d < UNREACHABLE}
+
+
+def bidirectional_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (movie, person) pairs from `source` to
+    `target`, or None if they are not connected, where `neighbors(person)`
+    yields the (movie, person) pairs one step away.
+
+    Each side keeps a BFS layer and a map of discovered people to the
+    (movie, person) step that discovered them. The smaller layer is
+    expanded one full level at a time, so the first person discovered by
+    both sides lies on a shortest path. If `stats` is a dictionary, the
+    number of expanded people is stored under "expanded".
+    """
+    if source == target:
+        return []
+
+    # person -> (movie, previous person on the way back to source/target)
+    source_parents = {source: None}
+    target_parents = {target: None}
+    source_layer = [source]
+    target_layer = [target]
+    expanded = 0
+    meeting = None
+
+    while source_layer and target_layer and meeting is None:
+        # always grow the side with fewer people waiting to be expanded
+        if len(source_layer) <= len(target_layer):
+            layer, parents, others = source_layer, source_parents, target_parents
+        else:
+            layer, parents, others = target_layer, target_parents, source_parents
+
+        next_layer = []
+        for person in layer:
+            expanded += 1
+            for movie, star in neighbors(person):
+                if star in parents:
+                    continue
+                parents[star] = (movie, person)
+                if star in others:
+                    meeting = star
+                    break
+                next_layer.append(star)
+            if meeting is not None:
+                break
+
+        if parents is source_parents:
+            source_layer = next_layer
+        else:
+            target_layer = next_layer
+
+    if stats is not None:
+        stats["expanded"] = expanded
+    if meeting is None:
+        return None
+
+    # walk back from the meeting person to the source...
+    path = []
+    person = meeting
+    while source_parents[person] is not None:
+        movie, previous = source_parents[person]
+        path.append((movie, person))
+        person = previous
+    path.reverse()
+
+    # ...then forward from the meeting person to the target
+    person = meeting
+    while target_parents[person] is not None:
+        movie, following = target_parents[person]
+        path.append((movie, following))
+        person = following
+
+    return path
+
+
+class CompactGraph():
+    """
+    Person <-> movie adjacency stored as CSR arrays over dense integer ids.
+
+    People and movies are numbered 0..n-1 in the order of `person_ids` and
+    `movie_ids`. The movies of person p are
+    person_movies[person_offsets[p]:person_offsets[p + 1]], and the stars
+    of movie m are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+    The four arrays may be `array`s or any integer memoryview.
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies,
+                 movie_offsets, movie_stars):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+    @cached_property
+    def person_index(self):
+        """
+        Maps person_ids to their index, built on first use.
+        """
+        return {person_id: i for i, person_id in enumerate(self.person_ids)}
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Build the graph from the `people` and `movies` dicts of degrees.py.
+        """
+        person_ids = list(people)
+        movie_ids = list(movies)
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        person_offsets = array("I", [0])
+        person_movies = array("I")
+        for person_id in person_ids:
+            person_movies.extend(sorted(movie_index[m] for m in people[person_id]["movies"]))
+            person_offsets.append(len(person_movies))
+
+        movie_offsets = array("I", [0])
+        movie_stars = array("I")
+        for movie_id in movie_ids:
+            movie_stars.extend(sorted(person_index[p] for p in movies[movie_id]["stars"]))
+            movie_offsets.append(len(movie_stars))
+
+        return cls(person_ids, movie_ids, person_offsets, person_movies,
+                   movie_offsets, movie_stars)
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def nbytes(self):
+        """
+        Returns the bytes used by the four adjacency arrays.
+        """
+        return sum(
+            len(a) * a.itemsize
+            for a in (self.person_offsets, self.person_movies,
+                      self.movie_offsets, self.movie_stars)
+        )
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for everyone who starred with `person`.
+        """
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        start, end = self.person_offsets[person], self.person_offsets[person + 1]
+        for movie in self.person_movies[start:end]:
+            for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                yield movie, star
+
+    def distances(self, source):
+        """
+        Returns a bytearray with the degrees of separation from `source`
+        to every person, or UNREACHABLE if there is no path.
+
+        Distances past 254 are stored as 254.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        dist = bytearray([UNREACHABLE]) * len(self)
+        dist[source] = 0
+        layer = [source]
+        depth = 0
+        while layer:
+            depth = min(depth + 1, UNREACHABLE - 1)
+            next_layer = []
+            for person in layer:
+                for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                    for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                        if dist[star] == UNREACHABLE:
+                            dist[star] = depth
+                            next_layer.append(star)
+            layer = next_layer
+        return dist
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie, person) index pairs from
+        `source` to `target`, or None if they are not connected, found by
+        `bidirectional_search`.
+        """
+        return bidirectional_search(source, target, self.neighbors, stats)
+
+    def path_ids(self, path):
+        """
+        Converts a path of index pairs into (movie_id, person_id) pairs.
+        """
+        return [(self.movie_ids[movie], self.person_ids[person]) for movie, person in path]
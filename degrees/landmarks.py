@@ -0,0 +1,208 @@
+"""
+Landmark distance index for degrees (ALT: A*, landmarks, triangle inequality).
+
+Usage: python landmarks.py [directory] [--count N] [--output FILE]
+
+Builds the index offline from a dataset and writes it to
+`directory`/landmarks.bin unless another output file is given.
+"""
+
+import argparse
+import heapq
+import json
+import os
+import struct
+
+from graph import UNREACHABLE
+
+MAGIC = b"DEGLMRK1"
+FILENAME = "landmarks.bin"
+
+
+class LandmarkIndex():
+    """
+    BFS distances from a few landmark people to everyone in a CompactGraph.
+
+    For any landmark L, |d(L, t) - d(L, v)| never exceeds d(v, t), so the
+    largest such difference is an admissible A* heuristic. If only one of
+    d(L, s) and d(L, t) is finite, s and t cannot be connected.
+    """
+
+    def __init__(self, landmarks, distances, people, edges):
+        self.landmarks = landmarks
+        # one bytearray of per-person distances for every landmark
+        self.distances = distances
+        # size of the graph the index was built for, to catch stale files
+        self.people = people
+        self.edges = edges
+
+    @classmethod
+    def build(cls, graph, count=16):
+        """
+        Pick up to `count` landmarks and compute their distances.
+
+        The first landmark is the person who starred in the most movies;
+        each next one is the reachable person farthest from all
+        landmarks chosen so far, which spreads them around the graph.
+        """
+        offsets = graph.person_offsets
+        first = max(range(len(graph)), key=lambda p: offsets[p + 1] - offsets[p])
+        landmarks = [first]
+        distances = [graph.distances(first)]
+        closest = bytearray(distances[0])
+
+        while len(landmarks) < count:
+            candidate, best = None, 0
+            for person, dist in enumerate(closest):
+                if dist != UNREACHABLE and dist > best:
+                    candidate, best = person, dist
+            if candidate is None:
+                break
+            landmarks.append(candidate)
+            distances.append(graph.distances(candidate))
+            closest = bytearray(map(min, closest, distances[-1]))
+
+        return cls(landmarks, distances, len(graph), len(graph.movie_stars))
+
+    def matches(self, graph):
+        """
+        Returns True if the index was built for a graph of this size.
+        """
+        return self.people == len(graph) and self.edges == len(graph.movie_stars)
+
+    def save(self, path):
+        header = json.dumps({
+            "landmarks": self.landmarks,
+            "people": self.people,
+            "edges": self.edges,
+        }).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for dist in self.distances:
+                f.write(dist)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns the index saved at `path`; raises ValueError if it is not
+        a landmark index or its distances do not fill the file.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a landmark index")
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+            body = f.read()
+        people = header["people"]
+        if len(body) != people * len(header["landmarks"]):
+            raise ValueError(f"{path} is truncated or damaged")
+        distances = [bytearray(body[i:i + people]) for i in range(0, len(body), people)]
+        return cls(header["landmarks"], distances, header["people"], header["edges"])
+
+    def separated(self, source, target):
+        """
+        Returns True if some landmark proves `source` and `target` are not connected.
+        """
+        for dist in self.distances:
+            if (dist[source] == UNREACHABLE) != (dist[target] == UNREACHABLE):
+                return True
+        return False
+
+    def shortest_path(self, graph, source, target, stats=None, astar=False):
+        """
+        Returns the shortest list of (movie, person) index pairs from
+        `source` to `target`, or None if they are not connected.
+
+        Pairs the landmarks prove disconnected are answered without
+        searching. Otherwise the graph's bidirectional BFS runs, or an A*
+        search guided by the landmarks if `astar` is set. On small-world
+        graphs the landmark bounds are loose and the BFS is usually faster.
+        """
+        if source == target:
+            if stats is not None:
+                stats["expanded"] = 0
+            return []
+        if self.separated(source, target):
+            if stats is not None:
+                stats["expanded"] = 0
+            return None
+        if not astar:
+            return graph.shortest_path(source, target, stats)
+
+        # restrict the heuristic to landmarks that can see the target
+        columns = [
+            (dist, dist[target]) for dist in self.distances
+            if dist[target] != UNREACHABLE
+        ]
+
+        def estimate(person):
+            bound = 0
+            for dist, goal in columns:
+                d = dist[person]
+                if d != UNREACHABLE:
+                    bound = max(bound, abs(d - goal))
+            return bound
+
+        parents = {source: None}
+        cost = {source: 0}
+        # entries are (estimated length, -degrees so far, person): on ties
+        # the deeper entry pops first so the search dives toward the target
+        queue = [(estimate(source), 0, source)]
+        expanded = 0
+        closed = set()
+        found = False
+
+        while queue:
+            _, depth, person = heapq.heappop(queue)
+            g = -depth
+            if person in closed:
+                continue
+            if person == target:
+                found = True
+                break
+            closed.add(person)
+            expanded += 1
+            for movie, star in graph.neighbors(person):
+                if star in closed or cost.get(star, g + 2) <= g + 1:
+                    continue
+                cost[star] = g + 1
+                parents[star] = (movie, person)
+                heapq.heappush(queue, (g + 1 + estimate(star), -(g + 1), star))
+
+        if stats is not None:
+            stats["expanded"] = expanded
+        if not found:
+            return None
+
+        path = []
+        person = target
+        while parents[person] is not None:
+            movie, previous = parents[person]
+            path.append((movie, person))
+            person = previous
+        path.reverse()
+        return path
+
+
+def main():
+    import degrees
+
+    parser = argparse.ArgumentParser(description="Build a landmark index for degrees.py")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=16, help="number of landmarks")
+    parser.add_argument("--output", help=f"index file (default: directory/{FILENAME})")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=True)
+    print("Building index...")
+    index = LandmarkIndex.build(degrees.graph, args.count)
+    output = args.output or os.path.join(args.directory, FILENAME)
+    index.save(output)
+    print(f"Wrote {len(index.landmarks)} landmarks to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+from array import array
+from bisect import bisect_left
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookups over lowercase names.
+
+    Names are kept in a sorted list, so every name starting with a prefix
+    is one contiguous slice found by binary search. Each name is also
+    split into character trigrams with an inverted index from trigram to
+    name positions, which narrows fuzzy lookups down to names sharing
+    enough trigrams with the query before edit distances are computed.
+    """
+
+    def __init__(self, names):
+        self.names = sorted(names)
+        postings = {}
+        lengths = {}
+        for i, name in enumerate(self.names):
+            for gram in set(trigrams(name)):
+                postings.setdefault(gram, []).append(i)
+            lengths.setdefault(len(name), []).append(i)
+        self.postings = {gram: array("I", ids) for gram, ids in postings.items()}
+        # name positions by length, for queries too short to filter by trigrams
+        self.lengths = {length: array("I", ids) for length, ids in lengths.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`, in order.
+        """
+        prefix = prefix.lower()
+        start = bisect_left(self.names, prefix)
+        matches = []
+        for name in self.names[start:start + limit]:
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+        return matches
+
+    def fuzzy(self, query, max_distance=2, limit=10):
+        """
+        Returns up to `limit` (distance, name) pairs for names within
+        `max_distance` edits of `query`, closest first. Inserting,
+        deleting, replacing or swapping two adjacent letters is one edit.
+
+        An edit changes at most four trigrams, so a string within k edits
+        of the query shares at least len(trigrams(query)) - 4k of its
+        trigrams, and must contain one of the rarest 4k + 1 of them. Names
+        found under those rare trigrams are checked for the full count
+        before the edit distance is computed. A query with no more than 4k
+        trigrams may share none with a match, so every name whose length
+        is within k of the query's is checked instead.
+        """
+        query = query.lower()
+        query_grams = set(trigrams(query))
+        grams = sorted(query_grams, key=lambda gram: len(self.postings.get(gram, ())))
+        needed = len(grams) - 4 * max_distance
+
+        candidates = set()
+        if needed > 0:
+            for gram in grams[:len(grams) - needed + 1]:
+                candidates.update(self.postings.get(gram, ()))
+        else:
+            for length in range(len(query) - max_distance, len(query) + max_distance + 1):
+                candidates.update(self.lengths.get(length, ()))
+
+        matches = []
+        for i in candidates:
+            name = self.names[i]
+            if abs(len(name) - len(query)) > max_distance:
+                continue
+            if len(query_grams.intersection(trigrams(name))) < needed:
+                continue
+            distance = edit_distance(query, name, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, name))
+        matches.sort()
+        return matches[:limit]
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` names for `query`: an exact match first,
+        then names starting with it, then the names closest to it if they
+        are within two edits.
+        """
+        query = query.lower()
+        results = self.prefix(query, limit)
+        if len(results) < limit:
+            # one edit is much cheaper to look for, so only widen if it finds nothing
+            matches = self.fuzzy(query, 1, limit) or self.fuzzy(query, 2, limit)
+            for _, name in matches:
+                if name not in results:
+                    results.append(name)
+                    if len(results) == limit:
+                        break
+        return results
+
+
+def trigrams(name):
+    """
+    Returns the character trigrams of `name`, padded so that the first
+    and last letters each start or end a trigram of their own.
+    """
+    padded = f"  {name} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the edit distance between `a` and `b`, counting adjacent
+    swaps as one edit (optimal string alignment), or `limit` + 1 as soon
+    as it is certain to exceed `limit`.
+    """
+    before = None
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (x != y),
+            )
+            if before is not None and j > 1 and x == b[j - 2] and a[i - 2] == y:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
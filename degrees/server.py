@@ -0,0 +1,90 @@
+"""
+Local HTTP server that keeps a loaded dataset resident between queries.
+
+    GET /query?source=NAME&target=NAME   answer one query as JSON
+    GET /stats                           latency statistics as JSON
+
+Requests are handed to a fixed pool of worker threads.
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from util import LatencyStats
+
+
+class QueryServer(HTTPServer):
+    """
+    HTTPServer that answers each connection on a worker from a thread pool.
+
+    `answer` is called with (source_name, target_name) and must return a
+    JSON-serialisable dictionary, like degrees.answer_query.
+    """
+
+    def __init__(self, address, answer, workers=4):
+        super().__init__(address, QueryHandler)
+        self.answer = answer
+        self.stats = LatencyStats()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self.send_json(200, self.server.stats.summary())
+        elif url.path == "/query":
+            query = parse_qs(url.query)
+            if "source" not in query or "target" not in query:
+                self.send_json(400, {"error": "Expected source and target parameters"})
+                return
+            start = time.perf_counter()
+            result = self.server.answer(query["source"][0], query["target"][0])
+            elapsed = time.perf_counter() - start
+            self.server.stats.record(elapsed)
+            result["elapsed_ms"] = round(elapsed * 1000, 3)
+            self.send_json(200, result)
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # latency is tracked in /stats instead
+
+
+def serve(port, answer, workers=4):
+    """
+    Serve queries on localhost:`port` until interrupted.
+    """
+    with QueryServer(("127.0.0.1", port), answer, workers) as httpd:
+        print(f"Serving on http://127.0.0.1:{port} with {workers} workers")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,156 @@
+"""
+Binary snapshots of a loaded degrees dataset.
+
+A snapshot file holds a short JSON header, the four CSR arrays of a
+CompactGraph and the ids, names, births, titles and years of its people
+and movies. Each of those string tables is one UTF-8 blob of the
+strings back to back plus an array of their lengths. The file is
+memory-mapped when the snapshot is read, so the arrays are not copied
+into Python objects and each string table is decoded in one call. The
+header records the size and mtime of the CSV files the snapshot was
+built from; if any of them changed, the snapshot is treated as stale.
+"""
+
+import json
+import mmap
+import os
+import struct
+from array import array
+from itertools import accumulate
+
+from graph import CompactGraph
+
+MAGIC = b"DEGSNAP1"
+VERSION = 2
+FILENAME = "snapshot.bin"
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_stars")
+TABLES = ("person_ids", "names", "births", "movie_ids", "titles", "years")
+
+
+def fingerprint(directory):
+    """
+    Returns the [filename, size, mtime_ns] of every CSV file in `directory`.
+    """
+    result = []
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        result.append([filename, stat.st_size, stat.st_mtime_ns])
+    return result
+
+
+def write_snapshot(path, directory, graph, people, movies):
+    """
+    Write `graph` and the name/title tables of `people` and `movies`
+    to `path`, stamped with the fingerprint of `directory`.
+    """
+    tables = (
+        graph.person_ids,
+        [people[p]["name"] for p in graph.person_ids],
+        [people[p]["birth"] for p in graph.person_ids],
+        graph.movie_ids,
+        [movies[m]["title"] for m in graph.movie_ids],
+        [movies[m]["year"] for m in graph.movie_ids],
+    )
+
+    blobs = [array("I", getattr(graph, name)).tobytes() for name in ARRAYS]
+    names = list(ARRAYS)
+    for name, strings in zip(TABLES, tables):
+        blobs.append(array("I", map(len, strings)).tobytes())
+        blobs.append("".join(strings).encode("utf-8"))
+        names += [name + "_lengths", name]
+
+    # lay the sections out after the header, each aligned to 8 bytes
+    sections = {}
+    offset = 0
+    for name, blob in zip(names, blobs):
+        sections[name] = [offset, len(blob)]
+        offset += len(blob) + (-len(blob) % 8)
+    header = json.dumps({
+        "version": VERSION,
+        "fingerprint": fingerprint(directory),
+        "itemsize": array("I").itemsize,
+        "sections": sections,
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+
+    # write to a temporary file first so a crash never leaves a torn snapshot
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+            f.write(b"\0" * (-len(blob) % 8))
+    os.replace(partial, path)
+
+
+def read_snapshot(path, directory):
+    """
+    Returns (graph, tables) from the snapshot at `path`, or None if it
+    is missing, unreadable or stale for the CSV files in `directory`.
+
+    `tables` is (person_ids, names, births, movie_ids, titles, years).
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        return _read_sections(data, directory)
+    except (ValueError, struct.error, TypeError, KeyError):
+        return None
+
+
+def _read_sections(data, directory):
+    """
+    Returns (graph, tables) from the mapped snapshot `data`, or None if
+    it is stale; raises ValueError or struct.error if it is damaged.
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        return None
+    (length,) = struct.unpack_from("<Q", data, len(MAGIC))
+    start = len(MAGIC) + 8
+    header = json.loads(data[start:start + length])
+    if not isinstance(header, dict) or not isinstance(header.get("sections"), dict):
+        raise ValueError("snapshot header is damaged")
+    if (header.get("version") != VERSION
+            or header.get("itemsize") != array("I").itemsize
+            or header.get("fingerprint") != fingerprint(directory)):
+        return None
+
+    base = start + length
+    view = memoryview(data)
+    sections = {}
+    for name, (offset, size) in header["sections"].items():
+        if offset < 0 or size < 0 or base + offset + size > len(data):
+            raise ValueError(f"section {name} lies outside the snapshot")
+        sections[name] = view[base + offset:base + offset + size]
+
+    tables = []
+    for name in TABLES:
+        lengths = sections[name + "_lengths"].cast("I")
+        text = str(sections[name], "utf-8")
+        ends = list(accumulate(lengths))
+        if (ends[-1] if ends else 0) != len(text):
+            raise ValueError(f"table {name} does not match its lengths")
+        tables.append([text[end - size:end] for end, size in zip(ends, lengths)])
+
+    person_ids, movie_ids = tables[0], tables[3]
+    arrays = [sections[name].cast("I") for name in ARRAYS]
+    person_offsets, person_movies, movie_offsets, movie_stars = arrays
+    if (len(person_offsets) != len(person_ids) + 1 or len(movie_offsets) != len(movie_ids) + 1
+            or person_offsets[-1] != len(person_movies) or movie_offsets[-1] != len(movie_stars)):
+        raise ValueError("graph arrays do not match the tables")
+    for offsets in (person_offsets, movie_offsets):
+        if any(start > end for start, end in zip(offsets, offsets[1:])):
+            raise ValueError("graph offsets decrease")
+    if len(person_movies) and max(person_movies) >= len(movie_ids):
+        raise ValueError("graph links to a missing movie")
+    if len(movie_stars) and max(movie_stars) >= len(person_ids):
+        raise ValueError("graph links to a missing person")
+    graph = CompactGraph(person_ids, movie_ids, *arrays)
+    return graph, tuple(tables)
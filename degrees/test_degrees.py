@@ -0,0 +1,400 @@
+import csv
+import io
+import json
+import struct
+import threading
+import urllib.request
+
+import pytest
+from degrees import *
+import degrees
+import distribution
+import server
+import snapshot
+
+
+PEOPLE = [
+    ("1", "Kevin Bacon", "1958"),
+    ("2", "Tom Hanks", "1956"),
+    ("3", "Sally Field", "1946"),
+    ("4", "Gary Sinise", "1955"),
+    ("5", "Emma Watson", "1990"),
+    ("6", "Dustin Hoffman", "1937"),
+    ("7", "Cary Elwes", "1962"),
+    ("8", "Emma Watson", "1985"),
+]
+
+MOVIES = [
+    ("10", "A Few Good Men", "1992"),
+    ("11", "Apollo 13", "1995"),
+    ("12", "Forrest Gump", "1994"),
+    ("13", "The Princess Bride", "1987"),
+    ("14", "Harry Potter", "2001"),
+]
+
+STARS = [
+    ("1", "10"), ("1", "11"), ("2", "11"), ("2", "12"), ("3", "12"),
+    ("4", "11"), ("4", "12"), ("6", "10"), ("7", "13"), ("5", "14"),
+]
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    for filename, header, rows in (
+        ("people.csv", ["id", "name", "birth"], PEOPLE),
+        ("movies.csv", ["id", "title", "year"], MOVIES),
+        ("stars.csv", ["person_id", "movie_id"], STARS),
+    ):
+        with open(tmp_path / filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+    names.clear()
+    people.clear()
+    movies.clear()
+    load_data(str(tmp_path))
+    return tmp_path
+
+
+def is_valid_path(source, target, path):
+    person = source
+    for movie, next_person in path:
+        if person not in movies[movie]["stars"] or next_person not in movies[movie]["stars"]:
+            return False
+        person = next_person
+    return person == target
+
+
+def test_shortest_path(dataset):
+    path = shortest_path("6", "3")
+    assert len(path) == 3
+    assert is_valid_path("6", "3", path)
+
+
+def test_shortest_path_not_connected(dataset):
+    assert shortest_path("1", "7") is None
+
+
+@pytest.mark.parametrize("source,target", [("6", "3"), ("3", "6"), ("1", "2"), ("4", "4"), ("1", "7")])
+def test_bidirectional_matches_single_sided(dataset, source, target):
+    single = shortest_path(source, target)
+    double = shortest_path(source, target, bidirectional=True)
+    if single is None:
+        assert double is None
+    else:
+        assert len(double) == len(single)
+        assert is_valid_path(source, target, double)
+
+
+def test_stats_count_expansions(dataset):
+    stats = {}
+    shortest_path("6", "3", bidirectional=True, stats=stats)
+    assert stats["expanded"] > 0
+
+
+def test_queue_frontier_is_fifo():
+    frontier = QueueFrontier()
+    for state in "abc":
+        frontier.add(Node(state, None, None))
+    assert frontier.contains_state("b")
+    assert [frontier.remove().state for _ in range(3)] == ["a", "b", "c"]
+    assert frontier.empty()
+    assert not frontier.contains_state("b")
+
+
+def test_stack_frontier_tracks_duplicate_states():
+    frontier = StackFrontier()
+    frontier.add(Node("a", None, None))
+    frontier.add(Node("a", None, None))
+    assert frontier.remove().state == "a"
+    assert frontier.contains_state("a")
+    frontier.remove()
+    assert not frontier.contains_state("a")
+    with pytest.raises(Exception):
+        frontier.remove()
+
+
+def test_compact_graph_matches_dicts(dataset):
+    compact = CompactGraph.from_dicts(people, movies)
+    assert len(compact) == len(people)
+    for source, target in [("6", "3"), ("3", "6"), ("1", "7"), ("5", "5")]:
+        path = compact.shortest_path(compact.person_index[source], compact.person_index[target])
+        expected = shortest_path(source, target)
+        if expected is None:
+            assert path is None
+        else:
+            assert len(path) == len(expected)
+            assert is_valid_path(source, target, compact.path_ids(path))
+
+
+def test_load_data_compact(dataset):
+    load_data(str(dataset), compact=True)
+    assert degrees.graph is not None
+    assert is_valid_path("6", "3", shortest_path("6", "3"))
+    load_data(str(dataset))
+    assert degrees.graph is None
+
+
+def test_snapshot_round_trip(dataset):
+    load_data(str(dataset), snapshot=True)
+    assert (dataset / "snapshot.bin").exists()
+    expected = (dict(names), dict(people), dict(movies))
+
+    names.clear()
+    people.clear()
+    movies.clear()
+    load_data(str(dataset), snapshot=True)
+    assert (names, people, movies) == expected
+    assert is_valid_path("6", "3", shortest_path("6", "3"))
+
+
+def test_snapshot_is_stale_after_csv_change(dataset):
+    load_data(str(dataset), snapshot=True)
+    with open(dataset / "people.csv", "a", encoding="utf-8") as f:
+        f.write("9,Meryl Streep,1949\n")
+    assert snapshot.read_snapshot(str(dataset / "snapshot.bin"), str(dataset)) is None
+
+
+@pytest.mark.parametrize("size", [0, 10, 0.5])
+def test_damaged_snapshot_is_ignored(dataset, size):
+    load_data(str(dataset), snapshot=True)
+    path = dataset / "snapshot.bin"
+    data = path.read_bytes()
+    path.write_bytes(data[:int(size * len(data)) if isinstance(size, float) else size])
+    assert snapshot.read_snapshot(str(path), str(dataset)) is None
+
+    names.clear()
+    people.clear()
+    movies.clear()
+    load_data(str(dataset), snapshot=True)
+    assert is_valid_path("6", "3", shortest_path("6", "3"))
+    assert snapshot.read_snapshot(str(path), str(dataset)) is not None
+
+
+
+def _patch_snapshot(path, edit):
+    """
+    Rewrites the snapshot at `path` with `edit(header, body)` applied to
+    its JSON header and the bytes after it.
+    """
+    data = path.read_bytes()
+    start = len(snapshot.MAGIC) + 8
+    (length,) = struct.unpack_from("<Q", data, len(snapshot.MAGIC))
+    header, body = json.loads(data[start:start + length]), bytearray(data[start + length:])
+    header = json.dumps(edit(header, body)).encode()
+    path.write_bytes(snapshot.MAGIC + struct.pack("<Q", len(header)) + header + body)
+
+
+def _bad_star(header, body):
+    offset, _ = header["sections"]["movie_stars"]
+    body[offset:offset + 4] = struct.pack("<I", 0xFFFFFF)
+    return header
+
+
+def _bad_offsets(header, body):
+    offset, _ = header["sections"]["person_offsets"]
+    body[offset:offset + 4] = struct.pack("<I", 1 << 20)
+    return header
+
+
+@pytest.mark.parametrize("edit", [
+    _bad_star,
+    _bad_offsets,
+    lambda header, body: {**header, "sections": list(header["sections"])},
+    lambda header, body: [header],
+])
+def test_inconsistent_snapshot_is_ignored(dataset, edit):
+    load_data(str(dataset), snapshot=True)
+    path = dataset / "snapshot.bin"
+    _patch_snapshot(path, edit)
+    assert snapshot.read_snapshot(str(path), str(dataset)) is None
+
+    names.clear()
+    people.clear()
+    movies.clear()
+    load_data(str(dataset), snapshot=True)
+    assert is_valid_path("6", "3", shortest_path("6", "3"))
+
+def test_run_batch_streams_json_lines(dataset):
+    lines = ["Dustin Hoffman\tSally Field\n", "Kevin Bacon\tNobody\n", "\n",
+             "Kevin Bacon\tEmma Watson\n", "just one name\n"]
+    output = io.StringIO()
+    stats = run_batch(lines, output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [r.get("degrees") for r in results] == [3, None, None, None]
+    assert results[0]["path"][-1]["person"] == "Sally Field"
+    assert results[1]["error"] == "Person not found: Nobody"
+    assert {c["id"] for c in results[2]["candidates"]} == {"5", "8"}
+    assert "error" in results[3]
+    assert stats.summary()["count"] == 4
+
+
+def test_server_answers_queries(dataset):
+    httpd = server.QueryServer(("127.0.0.1", 0), answer_query, workers=2)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/query?source=Kevin+Bacon&target=Tom+Hanks") as r:
+            assert json.load(r)["degrees"] == 1
+        with urllib.request.urlopen(f"{base}/stats") as r:
+            assert json.load(r)["count"] == 1
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_landmark_index(dataset, tmp_path):
+    compact = CompactGraph.from_dicts(people, movies)
+    index = LandmarkIndex.build(compact, count=3)
+    path = tmp_path / "landmarks.bin"
+    index.save(str(path))
+    index = LandmarkIndex.load(str(path))
+    assert index.matches(compact)
+
+    people_ids = sorted(people)
+    for source in people_ids:
+        for target in people_ids:
+            s, t = compact.person_index[source], compact.person_index[target]
+            expected = compact.shortest_path(s, t)
+            for astar in (False, True):
+                found = index.shortest_path(compact, s, t, astar=astar)
+                if expected is None:
+                    assert found is None
+                else:
+                    assert len(found) == len(expected)
+                    assert is_valid_path(source, target, compact.path_ids(found))
+
+
+def test_load_landmarks(dataset, tmp_path, monkeypatch):
+    load_data(str(dataset), compact=True)
+    expected = shortest_path("6", "3")
+    LandmarkIndex.build(degrees.graph, count=2).save(str(tmp_path / "landmarks.bin"))
+    load_landmarks(str(tmp_path / "landmarks.bin"))
+    assert degrees.landmark_index is not None
+    # queries must take the landmark A* search, not the plain BFS
+    monkeypatch.setattr(degrees.graph, "shortest_path", None)
+    assert shortest_path("1", "7") is None
+    path = shortest_path("6", "3")
+    assert is_valid_path("6", "3", path)
+    assert len(path) == len(expected)
+
+
+def test_truncated_landmarks_are_rejected(dataset, tmp_path):
+    load_data(str(dataset), compact=True)
+    path = tmp_path / "landmarks.bin"
+    LandmarkIndex.build(degrees.graph, count=2).save(str(path))
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError):
+        load_landmarks(str(path))
+
+
+def test_components(dataset):
+    assert components["1"] == components["3"] == components["6"]
+    assert len({components["1"], components["5"], components["7"], components["8"]}) == 4
+    stats = {}
+    assert shortest_path("1", "7", stats=stats) is None
+    assert stats["expanded"] == 0
+
+    summary = component_stats()
+    assert summary["components"] == 4
+    assert summary["people"] == 8
+    assert summary["largest"] == 5
+    assert summary["singletons"] == 3
+    assert summary["sizes"] == {5: 1, 1: 3}
+
+
+def test_all_shortest_paths(dataset):
+    paths = list(all_shortest_paths("6", "3"))
+    assert sorted(paths) == [
+        [("10", "1"), ("11", "2"), ("12", "3")],
+        [("10", "1"), ("11", "4"), ("12", "3")],
+    ]
+    assert list(all_shortest_paths("1", "1")) == [[]]
+    assert list(all_shortest_paths("1", "7")) == []
+
+
+def test_k_shortest_paths(dataset):
+    paths = list(k_shortest_paths("1", "3", 10))
+    lengths = [len(path) for path in paths]
+    assert lengths == sorted(lengths)
+    assert lengths[0] == 2
+    assert len({tuple(path) for path in paths}) == len(paths)
+    for path in paths:
+        assert is_valid_path("1", "3", path)
+        visited = ["1"] + [person for _, person in path]
+        assert len(set(visited)) == len(visited)
+    # 1-2-3 and 1-4-3, then 1-2-4-3 and 1-4-2-3 with 2 and 4 meeting in either movie
+    assert len(paths) == 6
+
+
+def test_separation_histogram(dataset):
+    with pytest.raises(ValueError):
+        distances_from("6")
+    load_data(str(dataset), compact=True)
+    assert separation_histogram("6") == {1: 1, 2: 2, 3: 1}
+    assert separation_histogram("7") == {}
+
+
+def test_separation_histograms_in_pool(dataset):
+    load_data(str(dataset), compact=True)
+    seeds = range(len(degrees.graph))
+    serial = distribution.separation_histograms(degrees.graph, seeds, workers=1)
+    pooled = distribution.separation_histograms(degrees.graph, seeds, workers=2)
+    assert serial == pooled
+    assert serial[1] == {1: 12, 2: 6, 3: 2}
+
+
+def test_costars_are_deduplicated_and_cached(dataset):
+    assert sorted(costars("2")) == [("11", "1"), ("11", "4"), ("12", "3")]
+    assert costars("5") == ()
+    costars("2")
+    info = costar_cache.info()
+    assert info["hits"] == 1
+    assert info["misses"] == 2
+    assert info["size"] == 2
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.info() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2}
+
+
+def test_precomputed_costar_table(dataset):
+    load_data(str(dataset), precompute_costars=True)
+    assert len(costar_table) == len(people)
+    assert sorted(costars("4")) == [("11", "1"), ("11", "2"), ("12", "3")]
+    assert is_valid_path("6", "3", shortest_path("6", "3"))
+    assert costar_cache.info()["misses"] == 0
+
+
+def test_name_index():
+    index = NameIndex(["kevin bacon", "kevin costner", "kevin kline", "tom hanks"])
+    assert index.prefix("kevin c") == ["kevin costner"]
+    assert index.prefix("Kevin") == ["kevin bacon", "kevin costner", "kevin kline"]
+    assert index.prefix("zz") == []
+    assert index.fuzzy("kevn bacn") == [(2, "kevin bacon")]
+    assert index.fuzzy("tom hanks", max_distance=0) == [(0, "tom hanks")]
+    # too short to share a trigram with either name, but two edits from both
+    assert NameIndex(["ab", "cd"]).fuzzy("xy") == [(2, "ab"), (2, "cd")]
+    assert index.search("tom hank") == ["tom hanks"]
+
+
+def test_resolve_name(dataset):
+    assert resolve_name("Kevin Bacn") == "1"
+    assert resolve_name("dustin") == "6"
+    assert resolve_name("Emma Watson", by="birth") == "8"
+    assert resolve_name("Zzzz Qqqq") is None
+    assert person_id_for_name("emma watson", interactive=False) in {"5", "8"}
+    assert rank_candidates(["3", "1", "2"]) == ["1", "2", "3"]
+
+
+def test_answer_query_suggests_names(dataset):
+    result = answer_query("Tom Hank", "Kevin Bacon")
+    assert result["suggestions"] == ["Tom Hanks"]
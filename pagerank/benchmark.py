@@ -0,0 +1,249 @@
+"""
+Benchmarks for pagerank.
+
+Usage: python benchmark.py crawl [directory] [--pages N] [--workers N]
+       python benchmark.py solvers [--pages N] [--damping D] [--tolerance T]
+       python benchmark.py pagerank [--graphs G ...] [--sizes N ...] [--html DIR]
+
+If `directory` has no HTML files yet, a synthetic corpus is written
+there first. The pagerank benchmark generates Erdos-Renyi, preferential
+attachment and mostly dangling graphs, times sampling and iteration on
+each, and checks that the two agree.
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+
+import solvers
+from crawler import crawl_graph, crawl_parallel
+from linkgraph import LinkGraph
+from pagerank import (DAMPING, crawl, crawl_serial, iterate_pagerank, sample_pagerank,
+                      sample_pagerank_batched)
+
+
+def write_corpus(directory, corpus):
+    """
+    Write `corpus` as HTML pages that `crawl` reads back as the same dict.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for page, links in corpus.items():
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html lang=\"en\">\n<head><title>{page}</title></head>\n<body>\n")
+            f.write(f"<h1>{page}</h1>\n")
+            for link in sorted(links):
+                f.write(f"<p>See <a href=\"{link}\">{link}</a>.</p>\n")
+            f.write("</body>\n</html>\n")
+
+
+def random_corpus(n, links=5, seed=0):
+    """
+    Returns a corpus dict of `n` pages, each linking to up to `links`
+    random other pages.
+    """
+    rng = random.Random(seed)
+    pages = [f"page{i}.html" for i in range(n)]
+    return {
+        page: set(rng.sample(pages, rng.randint(0, links))) - {page}
+        for page in pages
+    }
+
+
+def erdos_renyi_corpus(n, degree=5, seed=0):
+    """
+    Returns a corpus dict of `n` pages where each possible link is present
+    independently with probability degree / (n - 1).
+
+    Instead of flipping a coin for all N^2 pairs, the gap to the next
+    link of a page is drawn from the geometric distribution, so this
+    takes time proportional to the number of links.
+    """
+    rng = random.Random(seed)
+    pages = [f"page{i}.html" for i in range(n)]
+    p = min(1.0, degree / (n - 1)) if n > 1 else 0.0
+    corpus = {}
+    for i, page in enumerate(pages):
+        links = set()
+        j = -1
+        while p > 0:
+            j += 1 if p == 1 else 1 + int(math.log(1 - rng.random()) / math.log(1 - p))
+            if j >= n - 1:
+                break
+            # skip over the page itself
+            links.add(pages[j if j < i else j + 1])
+        corpus[page] = links
+    return corpus
+
+
+def preferential_corpus(n, links=3, seed=0):
+    """
+    Returns a corpus dict of `n` pages added one at a time, each linking
+    to `links` earlier pages chosen with probability proportional to
+    one plus the number of links they already receive, which gives the
+    heavy-tailed in-degrees of real link graphs.
+    """
+    rng = random.Random(seed)
+    pages = [f"page{i}.html" for i in range(n)]
+    corpus = {}
+    # every page once, plus once more per link it receives
+    pool = []
+    for i, page in enumerate(pages):
+        if i <= links:
+            targets = set(pages[:i])
+        else:
+            targets = set()
+            while len(targets) < links:
+                targets.add(rng.choice(pool))
+        corpus[page] = targets
+        pool.extend(targets)
+        pool.append(page)
+    return corpus
+
+
+def dangling_corpus(n, dangling=0.5, degree=5, seed=0):
+    """
+    Returns a corpus dict of `n` pages where a `dangling` fraction of the
+    pages have no links and the rest link to up to 2 * `degree` random
+    pages.
+    """
+    rng = random.Random(seed)
+    pages = [f"page{i}.html" for i in range(n)]
+    corpus = {}
+    for page in pages:
+        if rng.random() < dangling or n == 1:
+            corpus[page] = set()
+        else:
+            corpus[page] = set(rng.sample(pages, min(n, rng.randint(1, 2 * degree)))) - {page}
+    return corpus
+
+
+GENERATORS = {
+    "erdos-renyi": erdos_renyi_corpus,
+    "preferential": preferential_corpus,
+    "dangling": dangling_corpus,
+}
+
+
+def max_difference(ranks, expected):
+    """
+    Returns the largest absolute difference between two PageRank dicts.
+    """
+    return max(abs(ranks[page] - expected[page]) for page in expected)
+
+
+def ensure_corpus(directory, pages):
+    """
+    Write a synthetic corpus of `pages` pages to `directory` unless it has one.
+    """
+    if not os.path.isdir(directory) or not any(f.endswith(".html") for f in os.listdir(directory)):
+        print(f"Writing synthetic corpus of {pages} pages to {directory}...")
+        write_corpus(directory, random_corpus(pages))
+
+
+def benchmark_crawl(args):
+    ensure_corpus(args.directory, args.pages)
+    for label, run in (
+        ("crawl_serial", lambda: crawl_serial(args.directory)),
+        ("crawl_parallel", lambda: crawl_parallel(args.directory, args.workers)),
+        ("crawl_graph", lambda: crawl_graph(args.directory, args.workers)),
+        ("processes", lambda: crawl_graph(args.directory, args.workers, processes=True)),
+    ):
+        start = time.perf_counter()
+        result = run()
+        seconds = time.perf_counter() - start
+        print(f"  {label:>14}: {seconds:7.2f}s for {len(result)} pages")
+
+
+def benchmark_solvers(args):
+    graph = LinkGraph.from_corpus(random_corpus(args.pages))
+    print(f"{len(graph)} pages, {len(graph.targets)} links, d = {args.damping}")
+    for solver in solvers.SOLVERS:
+        stats = {}
+        solvers.solve(graph, args.damping, solver, args.tolerance, args.max_iterations, stats)
+        status = "" if stats["converged"] else " (not converged)"
+        print(f"  {solver:>12}: {stats['iterations']:5} iterations, "
+              f"{sum(stats['seconds']):7.3f}s, residual {stats['residuals'][-1]:.1e}{status}")
+
+
+def benchmark_pagerank(args):
+    failures = 0
+    for name in args.graphs:
+        for size in args.sizes:
+            corpus = GENERATORS[name](size, seed=args.seed)
+            if args.html:
+                directory = os.path.join(args.html, f"{name}-{size}")
+                if not os.path.isdir(directory):
+                    write_corpus(directory, corpus)
+                corpus = crawl(directory)
+            links = sum(len(targets) for targets in corpus.values())
+            dangling = sum(not targets for targets in corpus.values())
+            print(f"{name}: {size} pages, {links} links, {dangling} dangling")
+
+            samples = args.samples_per_page * size
+            random.seed(args.seed)
+            runs = [
+                ("iterate", lambda: iterate_pagerank(corpus, DAMPING)),
+                ("iterate L1", lambda: iterate_pagerank(corpus, DAMPING, solver="power",
+                                                        tolerance=args.tolerance / 100)),
+                ("sample", lambda: sample_pagerank(corpus, DAMPING, samples)),
+                ("batched", lambda: sample_pagerank_batched(corpus, DAMPING, samples, seed=args.seed)),
+            ]
+            if size <= args.dict_limit:
+                runs.append(("iterate dict", lambda: iterate_pagerank(corpus, DAMPING, engine="dict")))
+
+            results = {}
+            for label, run in runs:
+                start = time.perf_counter()
+                results[label] = run()
+                print(f"  {label:>12}: {time.perf_counter() - start:7.3f}s")
+
+            reference = results["iterate L1"]
+            for label, ranks in results.items():
+                if label == "iterate L1":
+                    continue
+                difference = max_difference(ranks, reference)
+                ok = difference <= args.tolerance
+                failures += not ok
+                print(f"  {label:>12}: max difference {difference:.2e} {'ok' if ok else 'FAIL'}")
+    if failures:
+        raise SystemExit(f"{failures} results differ by more than {args.tolerance}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for pagerank.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = commands.add_parser("crawl", help="serial vs parallel crawling")
+    crawl_parser.add_argument("directory", nargs="?", default="synthetic")
+    crawl_parser.add_argument("--pages", type=int, default=100000)
+    crawl_parser.add_argument("--workers", type=int, default=None)
+    crawl_parser.set_defaults(run=benchmark_crawl)
+
+    solvers_parser = commands.add_parser("solvers", help="iterations and time of each solver")
+    solvers_parser.add_argument("--pages", type=int, default=100000)
+    solvers_parser.add_argument("--damping", type=float, default=0.85)
+    solvers_parser.add_argument("--tolerance", type=float, default=1e-8)
+    solvers_parser.add_argument("--max-iterations", type=int, default=1000)
+    solvers_parser.set_defaults(run=benchmark_solvers)
+
+    pagerank_parser = commands.add_parser("pagerank", help="sampling vs iteration on generated graphs")
+    pagerank_parser.add_argument("--graphs", nargs="+", choices=GENERATORS, default=list(GENERATORS))
+    pagerank_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    pagerank_parser.add_argument("--samples-per-page", type=int, default=100)
+    pagerank_parser.add_argument("--tolerance", type=float, default=0.01,
+                                 help="largest allowed difference from the converged ranks")
+    pagerank_parser.add_argument("--dict-limit", type=int, default=2000,
+                                 help="largest graph to run the O(N^2) dict engine on")
+    pagerank_parser.add_argument("--html", metavar="DIR",
+                                 help="write each graph as HTML under DIR and crawl it back")
+    pagerank_parser.add_argument("--seed", type=int, default=0)
+    pagerank_parser.set_defaults(run=benchmark_pagerank)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,52 @@
+import argparse
+import heapq
 import os
 import random
 import re
-import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import solvers
+import store
+from crawler import crawl_graph, crawl_parallel
+from linkgraph import (LinkGraph, batched_walks, normalize_personalization, personalized_power_iteration,
+                       power_iteration, push_pagerank, random_walk, teleport_vector)
 
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser(
+        usage="python pagerank.py corpus [--workers N [--seed S]] [--top K [--store DIR]]"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--workers", type=int,
+                        help="sample with this many parallel walker processes")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="base seed for the parallel walkers")
+    parser.add_argument("--top", type=int, metavar="K",
+                        help="print the K best pages from the stored ranks and exit")
+    parser.add_argument("--store", metavar="DIR",
+                        help="where --top keeps the graph and ranks (default: corpus/.pagerank)")
+    args = parser.parse_args()
+
+    if args.top is not None:
+        graph, ranks, fresh = stored_pagerank(args.corpus, DAMPING, args.store)
+        print(f"Top {args.top} pages ({'recomputed' if fresh else 'from store'})")
+        for page, rank in store.top_pages(graph, ranks, args.top):
+            print(f"  {page}: {rank:.4f}")
+        return
+
+    corpus = crawl(args.corpus)
+    if args.workers:
+        stats = {}
+        ranks = parallel_sample_pagerank(corpus, DAMPING, SAMPLES, args.workers, args.seed, stats)
+        print(f"PageRank Results from Sampling (n = {SAMPLES}, {args.workers} workers, "
+              f"{stats['steps_per_second_per_core']:,.0f} steps/sec per core)")
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+        print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
     ranks = iterate_pagerank(corpus, DAMPING)
@@ -21,11 +55,47 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
+def stored_pagerank(directory, damping_factor, store_directory=None):
+    """
+    Return (graph, ranks, recomputed) for the corpus in `directory`,
+    loading the LinkGraph and rank vector saved in `store_directory`
+    when the corpus fingerprint is unchanged, and crawling, computing
+    and saving them otherwise.
+    """
+
+    store_directory = store_directory or os.path.join(directory, ".pagerank")
+    os.makedirs(store_directory, exist_ok=True)
+    corpus_fingerprint = store.fingerprint(directory)
+
+    recomputed = False
+    graph = store.load_graph(store_directory, corpus_fingerprint)
+    if graph is None:
+        graph = crawl_graph(directory)
+        store.save_graph(store_directory, graph, corpus_fingerprint)
+    ranks = store.load_ranks(store_directory, damping_factor, corpus_fingerprint)
+    if ranks is None or len(ranks) != len(graph):
+        ranks = power_iteration(graph, damping_factor)
+        store.save_ranks(store_directory, ranks, damping_factor, corpus_fingerprint)
+        recomputed = True
+    return graph, ranks, recomputed
+
+
 def crawl(directory):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    The pages are scanned in parallel by `crawler.crawl_parallel`; see
+    `crawl_serial` for the plain one-file-at-a-time version.
+    """
+    return crawl_parallel(directory)
+
+
+def crawl_serial(directory):
+    """
+    Return the same dictionary as `crawl`, reading and parsing one page
+    at a time.
     """
     pages = dict()
 
@@ -48,7 +118,7 @@ def crawl(directory):
     return pages
 
 
-def transition_model(corpus, page, damping_factor):
+def transition_model(corpus, page, damping_factor, personalization=None):
     """
     Return a probability distribution over which page to visit next,
     given a current page.
@@ -56,10 +126,25 @@ def transition_model(corpus, page, damping_factor):
     With probability `damping_factor`, choose a link at random
     linked to by `page`. With probability `1 - damping_factor`, choose
     a link at random chosen from all pages in the corpus.
+
+    If `personalization` is a {page: weight} dictionary, random jumps
+    (and every move away from a page without links) land on a page in
+    proportion to its weight instead of uniformly.
     """
 
     no_of_pages = len(corpus)
 
+    if personalization is not None:
+        weights = normalize_personalization(corpus, personalization)
+        teleport = {key: weights.get(key, 0.0) for key in corpus}
+        distribution = {key: (1 - damping_factor) * teleport[key] for key in corpus}
+        links = corpus[page]
+        if not links:
+            return teleport
+        for linked_page in links:
+            distribution[linked_page] += damping_factor / len(links)
+        return distribution
+
     # this will make a dictionary with keys from the corpus and set their initial values as (1-d/N)
     probability_distribution = {key: (1-damping_factor)/no_of_pages for key in corpus}
 
@@ -84,38 +169,91 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Instead of building the transition model's distribution on every
+    step, each step flips one coin between following a random link and
+    jumping to a random page (see `random_walk`), which is O(1).
+    """
+
+    graph = LinkGraph.from_corpus(corpus)
+    counts = random_walk(graph, damping_factor, n)
+    return graph.to_dict(count / n for count in counts)
+
+
+def sample_pagerank_batched(corpus, damping_factor, n, walkers=1024, seed=None):
+    """
+    Return the same estimate as `sample_pagerank` from `n` samples split
+    over `walkers` surfers moved together with NumPy batched random draws,
+    which is practical for millions of samples. Each surfer takes a few
+    uncounted steps first (see `batched_walks`) so that its random start
+    does not bias the estimate.
     """
 
-    Pagerank = {key: 0 for key in corpus}  # making a new dictionary with 0 values as for everypage
+    graph = LinkGraph.from_corpus(corpus)
+    counts = batched_walks(graph, damping_factor, n, walkers, seed)
+    return graph.to_dict(count / n for count in counts)
+
+
+def parallel_sample_pagerank(corpus, damping_factor, n, workers=None, seed=0, stats=None):
+    """
+    Return the same estimate as `sample_pagerank` from `n` samples split
+    over `workers` independent surfers, one per process, and merge their
+    visit counts.
+
+    Walker i draws from random.Random(f"{seed}:{i}"), so the result only
+    depends on `seed` and `workers`. If `stats` is a dictionary, the
+    workers, total seconds spent walking and the mean steps per second
+    of each worker are stored in it.
+    """
 
-    page = random.choice(list(Pagerank.keys()))  # selects a random page for starting
+    workers = workers or os.cpu_count()
+    graph = LinkGraph.from_corpus(corpus)
+    jobs = [
+        (f"{seed}:{i}", n // workers + (1 if i < n % workers else 0))
+        for i in range(workers)
+    ]
 
-    # adds the no of visits to the page, since the page is visited once already it is manually added by 1
-    Pagerank[page] += 1
+    if workers == 1:
+        _init_walker(graph, damping_factor)
+        results = [_walk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_walker,
+                                 initargs=(graph, damping_factor)) as pool:
+            results = list(pool.map(_walk, jobs))
 
-    for i in range(n):  # runs for the number of SAMPLES
-        # this will return a dictionary for the amount of probabilities for each page
-        distribution = transition_model(corpus, page, damping_factor)
+    totals = [0] * len(graph)
+    for counts, _ in results:
+        for page, count in enumerate(counts):
+            totals[page] += count
 
-        ''' this uses random.choices() to randomly choose from the pages with corresponding probabilites
-            it makes a dictionary that has keys as the pages and weights(probability) and choice as k=1(meaning only one can be selected)
-            this will select any random one of the pages using the probabilites they come with
-            (higher the probabilty higher is the chance of selection)'''
-        page = random.choices(
-            list(distribution.keys()),
-            weights=list(distribution.values()),
-            k=1
-        )[0]
+    if stats is not None:
+        rates = [steps / seconds for (_, steps), (_, seconds) in zip(jobs, results) if seconds > 0]
+        stats["workers"] = workers
+        stats["seconds"] = sum(seconds for _, seconds in results)
+        stats["steps_per_second_per_core"] = sum(rates) / len(rates) if rates else 0.0
 
-        Pagerank[page] += 1  # the page is taken and marked as a visit
+    return graph.to_dict(count / n for count in totals)
 
-    for point in Pagerank:  # for loop iterates over all of the pages and divides their values by the sampling number
-        Pagerank[point] /= n
 
-    return Pagerank  # returns the final probability ranking
+# Graph and damping factor of the current walker process, set by _init_walker
+_walker = None
 
 
-def iterate_pagerank(corpus, damping_factor):
+def _init_walker(graph, damping_factor):
+    global _walker
+    _walker = (graph, damping_factor)
+
+
+def _walk(job):
+    seed, steps = job
+    graph, damping_factor = _walker
+    start = time.perf_counter()
+    counts = random_walk(graph, damping_factor, steps, random.Random(seed))
+    return counts, time.perf_counter() - start
+
+
+def iterate_pagerank(corpus, damping_factor, engine="sparse", solver=None,
+                     tolerance=1e-8, max_iterations=1000, stats=None, personalization=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -123,8 +261,37 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    The "sparse" engine builds a LinkGraph once and runs power iteration
+    over its links; the "dict" engine is the original loop over every
+    pair of pages, which is O(N^2) per round. Both stop once no value
+    changes by 0.001 or more in a round.
+
+    If `solver` is one of `solvers.SOLVERS`, the sparse graph is solved
+    with it instead, until one iteration changes the values by less than
+    `tolerance` in L1 norm or after `max_iterations` iterations, and the
+    residual and time of each iteration are stored in `stats` (see
+    `solvers.solve`).
+
+    `personalization` biases the ranking as in `transition_model`; it
+    needs the sparse engine.
     """
 
+    if engine == "sparse":
+        graph = LinkGraph.from_corpus(corpus)
+        teleport = None if personalization is None else teleport_vector(graph, personalization)
+        if solver is not None:
+            return graph.to_dict(solvers.solve(
+                graph, damping_factor, solver, tolerance, max_iterations, stats, teleport
+            ))
+        return graph.to_dict(power_iteration(graph, damping_factor, teleport=teleport))
+    elif engine != "dict":
+        raise ValueError(f"unknown engine {engine!r}")
+    if solver is not None:
+        raise ValueError("a solver can only be used with the sparse engine")
+    if personalization is not None:
+        raise ValueError("personalization can only be used with the sparse engine")
+
     no_of_pages = len(corpus)
 
     # makes a dictionary that has keys of the corpus and initial value as (1/N)
@@ -158,5 +325,73 @@ def iterate_pagerank(corpus, damping_factor):
     return Pagerank
 
 
+def personalized_pagerank(corpus, damping_factor, seed_sets, k=None, tolerance=1e-8):
+    """
+    Return one PageRank dictionary per set of pages in `seed_sets`, where
+    random jumps land only on the pages of that set (topic-sensitive
+    PageRank). All sets are iterated together as one block, see
+    `personalized_power_iteration`.
+
+    If `k` is given, return for each set only its `k` best (page, rank)
+    pairs instead, best first, as from `top_pages`.
+    """
+
+    graph = LinkGraph.from_corpus(corpus)
+    teleports = [teleport_vector(graph, dict.fromkeys(seeds, 1)) for seeds in seed_sets]
+    vectors = personalized_power_iteration(graph, damping_factor, teleports, tolerance)
+    if k is None:
+        return [graph.to_dict(ranks) for ranks in vectors]
+    return [store.top_pages(graph, ranks, k) for ranks in vectors]
+
+
+def top_pages(ranks, k):
+    """
+    Return the `k` best (page, rank) pairs of a PageRank dictionary,
+    best first, in O(N log k) rather than sorting every page.
+    """
+
+    return heapq.nlargest(k, ranks.items(), key=lambda item: item[1])
+
+
+def update_pagerank(corpus, ranks, damping_factor, added_pages=(), removed_pages=(),
+                    added_links=(), removed_links=(), tolerance=1e-4, stats=None):
+    """
+    Return (corpus, ranks) after applying a diff to `corpus`, whose
+    PageRank values were `ranks`, without recomputing from scratch.
+
+    `added_pages` and `removed_pages` are page names; `added_links` and
+    `removed_links` are (page, linked page) pairs. Removing a page also
+    drops the links to it, and links to pages outside the corpus are
+    ignored as in `crawl`. The old ranks (and 1/N for new pages) are the
+    starting estimate, refined by `push_pagerank` so that only pages near
+    the changes do much work. If `stats` is a dictionary, the number of
+    pushes is stored under "pushes".
+    """
+
+    corpus = {page: set(links) for page, links in corpus.items()}
+    for page in added_pages:
+        corpus.setdefault(page, set())
+    for page in removed_pages:
+        corpus.pop(page, None)
+    for links in corpus.values():
+        links.difference_update(removed_pages)
+    for page, link in removed_links:
+        if page in corpus:
+            corpus[page].discard(link)
+    for page, link in added_links:
+        if page in corpus and link in corpus and link != page:
+            corpus[page].add(link)
+
+    graph = LinkGraph.from_corpus(corpus)
+    estimate = [ranks.get(page, 1 / len(graph)) for page in graph.pages]
+    total = sum(estimate)
+    new_ranks, pushes = push_pagerank(
+        graph, [rank / total for rank in estimate], damping_factor, tolerance
+    )
+    if stats is not None:
+        stats["pushes"] = pushes
+    return corpus, graph.to_dict(new_ranks)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,238 @@
+"""
+PageRank solvers with an L1 stopping rule and per-iteration statistics.
+
+"power" is plain power iteration. "gauss-seidel" sweeps the pages in
+order and uses each page's new rank as soon as it is computed, which
+usually needs fewer sweeps. "aitken" and "quadratic" are power iteration
+with the extrapolation of Kamvar et al. applied every EXTRAPOLATE_EVERY
+steps, which cancels the slowest-decaying error terms using the last
+three or four iterates. Aitken assumes a single real subdominant
+eigenvalue and can slow convergence on graphs whose error oscillates;
+quadratic extrapolation also handles a complex pair.
+
+Power iteration and the extrapolations use NumPy when it is installed;
+Gauss-Seidel is sequential by nature and always runs in Python.
+"""
+
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import linkgraph
+
+SOLVERS = ("power", "gauss-seidel", "aitken", "quadratic")
+
+# Steps of power iteration between two extrapolations
+EXTRAPOLATE_EVERY = 10
+
+
+def solve(graph, damping_factor, solver="power", tolerance=1e-8, max_iterations=1000, stats=None,
+          teleport=None):
+    """
+    Returns the PageRank vector of `graph` as a list, computed with
+    `solver` until the L1 norm of the change made by one iteration is
+    below `tolerance`, or for at most `max_iterations` iterations.
+    `teleport` is an optional jump distribution as in
+    `linkgraph.power_iteration`.
+
+    If `stats` is a dictionary, the solver, the number of iterations,
+    whether it converged, and lists with the L1 residual and the seconds
+    taken by each iteration are stored in it.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}")
+
+    residuals = []
+    seconds = []
+    if solver == "gauss-seidel":
+        iterations = _gauss_seidel(graph, damping_factor, teleport)
+    else:
+        extrapolate = {"aitken": 3, "quadratic": 4}.get(solver)
+        iterations = _power(graph, damping_factor, extrapolate, teleport)
+
+    ranks = None
+    start = time.perf_counter()
+    for ranks, residual in iterations:
+        now = time.perf_counter()
+        residuals.append(residual)
+        seconds.append(now - start)
+        start = now
+        if residual < tolerance or len(residuals) >= max_iterations:
+            break
+
+    if stats is not None:
+        stats["solver"] = solver
+        stats["iterations"] = len(residuals)
+        stats["converged"] = bool(residuals) and residuals[-1] < tolerance
+        stats["residuals"] = residuals
+        stats["seconds"] = seconds
+
+    total = sum(ranks)
+    return [float(rank) / total for rank in ranks]
+
+
+def _power(graph, damping_factor, extrapolate=None, teleport=None):
+    """
+    Yields (ranks, L1 residual) after each step of power iteration,
+    replacing every EXTRAPOLATE_EVERY-th iterate by the Aitken (3 iterates)
+    or quadratic (4 iterates) extrapolation when `extrapolate` is set.
+    """
+    n = len(graph)
+    if np is not None:
+        step = linkgraph.numpy_stepper(graph, damping_factor, teleport)
+        ranks = np.full(n, 1 / n)
+    else:
+        step = lambda x: linkgraph.power_step(graph, x, damping_factor, teleport)
+        ranks = [1 / n] * n
+
+    history = [ranks]
+    steps = 0
+    while True:
+        new_ranks = step(ranks)
+        steps += 1
+        residual = _l1(new_ranks, ranks)
+        history = history[-3:] + [new_ranks]
+        if extrapolate and steps % EXTRAPOLATE_EVERY == 0 and len(history) >= extrapolate:
+            if extrapolate == 3:
+                new_ranks = _aitken(*history[-3:])
+            else:
+                new_ranks = _quadratic(*history[-4:])
+            history = [new_ranks]
+        ranks = new_ranks
+        yield ranks, residual
+
+
+def _l1(a, b):
+    if np is not None:
+        return float(np.abs(a - b).sum())
+    return sum(abs(x - y) for x, y in zip(a, b))
+
+
+def _aitken(x0, x1, x2):
+    """
+    Returns the componentwise Aitken delta-squared extrapolation of three
+    successive iterates, keeping x2 where the second difference vanishes.
+    """
+    if np is not None:
+        h = x2 - 2 * x1 + x0
+        safe = np.abs(h) > 1e-15
+        extrapolated = np.where(safe, x0 - (x1 - x0) ** 2 / np.where(safe, h, 1), x2)
+        return _normalized(np.abs(extrapolated))
+    extrapolated = []
+    for a, b, c in zip(x0, x1, x2):
+        h = c - 2 * b + a
+        extrapolated.append(abs(a - (b - a) ** 2 / h) if abs(h) > 1e-15 else c)
+    return _normalized(extrapolated)
+
+
+def _quadratic(x0, x1, x2, x3):
+    """
+    Returns the quadratic extrapolation of four successive iterates,
+    which assumes the error lies in the span of the two subdominant
+    eigenvectors and solves for its coefficients by least squares.
+    """
+    y1, y2, y3 = (_difference(x, x0) for x in (x1, x2, x3))
+    # normal equations of min |g1 y1 + g2 y2 + y3|
+    a11, a12, a22 = _dot(y1, y1), _dot(y1, y2), _dot(y2, y2)
+    b1, b2 = -_dot(y1, y3), -_dot(y2, y3)
+    determinant = a11 * a22 - a12 * a12
+    if abs(determinant) < 1e-300:
+        return x3
+    g1 = (b1 * a22 - b2 * a12) / determinant
+    g2 = (a11 * b2 - a12 * b1) / determinant
+    beta0, beta1, beta2 = g1 + g2 + 1, g2 + 1, 1
+    if np is not None:
+        return _normalized(np.abs(beta0 * x1 + beta1 * x2 + beta2 * x3))
+    return _normalized([abs(beta0 * a + beta1 * b + beta2 * c) for a, b, c in zip(x1, x2, x3)])
+
+
+def _difference(a, b):
+    if np is not None:
+        return a - b
+    return [x - y for x, y in zip(a, b)]
+
+
+def _dot(a, b):
+    if np is not None:
+        return float(a @ b)
+    return sum(x * y for x, y in zip(a, b))
+
+
+def _normalized(ranks):
+    total = sum(ranks)
+    if np is not None:
+        return ranks / total
+    return [rank / total for rank in ranks]
+
+
+def _gauss_seidel(graph, damping_factor, teleport=None):
+    """
+    Yields (ranks, L1 residual) after each Gauss-Seidel sweep over the
+    linear system x = ((1 - d) + d * dangling mass) * v + d * A x, where
+    v is the teleport distribution (uniform by default).
+
+    Each page's rank is recomputed from its in-links, reading ranks
+    already updated in this sweep. The dangling mass is kept up to date
+    as dangling pages change, and a dangling page's own share of it is
+    moved to the left-hand side. The total rank of a sweep drifts from 1
+    and only returns at rate d, so each sweep is rescaled to sum to 1.
+    """
+    n = len(graph)
+    offsets = graph.offsets
+    in_offsets, sources = _in_links(graph)
+    inverse_degree = [
+        1 / (offsets[i + 1] - offsets[i]) if offsets[i + 1] != offsets[i] else 0.0
+        for i in range(n)
+    ]
+    is_dangling = [False] * n
+    for page in graph.dangling:
+        is_dangling[page] = True
+
+    if teleport is None:
+        teleport = [1 / n] * n
+    ranks = [1 / n] * n
+    dangling = sum(ranks[page] for page in graph.dangling)
+    while True:
+        previous = ranks[:]
+        for page in range(n):
+            inflow = 0.0
+            for source in sources[in_offsets[page]:in_offsets[page + 1]]:
+                inflow += ranks[source] * inverse_degree[source]
+            old = ranks[page]
+            weight = teleport[page]
+            if is_dangling[page]:
+                new = ((1 - damping_factor) * weight + damping_factor * (inflow + (dangling - old) * weight)) \
+                    / (1 - damping_factor * weight)
+                dangling += new - old
+            else:
+                new = (1 - damping_factor) * weight + damping_factor * (inflow + dangling * weight)
+            ranks[page] = new
+        total = sum(ranks)
+        ranks = [rank / total for rank in ranks]
+        dangling /= total
+        yield ranks, sum(abs(new - old) for new, old in zip(ranks, previous))
+
+
+def _in_links(graph):
+    """
+    Returns (offsets, sources) in CSR form for the reversed graph, so
+    the pages linking to page i are sources[offsets[i]:offsets[i + 1]].
+    """
+    n = len(graph)
+    counts = [0] * (n + 1)
+    for target in graph.targets:
+        counts[target + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+    in_offsets = array("I", counts)
+    sources = array("I", bytes(4 * len(graph.targets)))
+    position = counts[:n]
+    for page in range(n):
+        for target in graph.targets[graph.offsets[page]:graph.offsets[page + 1]]:
+            sources[position[target]] = page
+            position[target] += 1
+    return in_offsets, sources
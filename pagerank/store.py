@@ -0,0 +1,144 @@
+"""
+On-disk store for a crawled link graph and its PageRank vector.
+
+graph.bin holds the page-name table and the CSR offset/target arrays of
+a LinkGraph; ranks.bin holds one float64 rank per page. Both start with
+a JSON header carrying the fingerprint of the corpus they came from and
+are memory-mapped when loaded, so a stale store is detected without
+crawling and a fresh one is used without copying its arrays.
+"""
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from linkgraph import LinkGraph
+
+MAGIC = b"PRSTORE1"
+GRAPH_FILE = "graph.bin"
+RANKS_FILE = "ranks.bin"
+
+
+def fingerprint(directory):
+    """
+    Returns a hash of the name, size and mtime of every page in `directory`.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".html"):
+            stat = os.stat(os.path.join(directory, name))
+            digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write(path, header, blobs):
+    """
+    Write MAGIC, a JSON header with the size of each blob, and the blobs
+    padded to 8 bytes, replacing `path` atomically.
+    """
+    header = dict(header, sizes=[len(blob) for blob in blobs])
+    encoded = json.dumps(header).encode("utf-8")
+    encoded += b" " * (-(len(MAGIC) + 8 + len(encoded)) % 8)
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for blob in blobs:
+            f.write(blob)
+            f.write(b"\0" * (-len(blob) % 8))
+    os.replace(partial, path)
+
+
+def _read(path):
+    """
+    Returns (header, [memoryview of each blob]) for a file written by
+    `_write`, or None if it is missing, damaged or not a store file.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        if data[:len(MAGIC)] != MAGIC:
+            return None
+        (length,) = struct.unpack_from("<Q", data, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(data[start:start + length])
+        if not isinstance(header, dict):
+            return None
+        view = memoryview(data)
+        blobs = []
+        offset = start + length
+        for size in header["sizes"]:
+            if size < 0 or offset + size > len(data):
+                return None
+            blobs.append(view[offset:offset + size])
+            offset += size + (-size % 8)
+        return header, blobs
+    except (ValueError, struct.error, KeyError, TypeError):
+        return None
+
+
+def save_graph(directory, graph, corpus_fingerprint):
+    pages = "\n".join(graph.pages).encode("utf-8")
+    _write(os.path.join(directory, GRAPH_FILE), {"fingerprint": corpus_fingerprint}, [
+        pages, array("I", graph.offsets).tobytes(), array("I", graph.targets).tobytes(),
+    ])
+
+
+def load_graph(directory, corpus_fingerprint):
+    """
+    Returns the stored LinkGraph, or None if it is missing or stale.
+    """
+    loaded = _read(os.path.join(directory, GRAPH_FILE))
+    if loaded is None or loaded[0].get("fingerprint") != corpus_fingerprint:
+        return None
+    try:
+        pages, offsets, targets = loaded[1]
+        names = str(pages, "utf-8").split("\n") if len(pages) else []
+        offsets, targets = offsets.cast("I"), targets.cast("I")
+    except (ValueError, TypeError):
+        return None
+    if len(offsets) != len(names) + 1 or offsets[-1] != len(targets):
+        return None
+    if len(targets) and max(targets) >= len(names):
+        return None
+    return LinkGraph(names, offsets, targets)
+
+
+def save_ranks(directory, ranks, damping_factor, corpus_fingerprint):
+    _write(os.path.join(directory, RANKS_FILE),
+           {"fingerprint": corpus_fingerprint, "damping": damping_factor},
+           [array("d", ranks).tobytes()])
+
+
+def load_ranks(directory, damping_factor, corpus_fingerprint):
+    """
+    Returns the stored rank vector as a float64 memoryview, or None if
+    it is missing, stale or for another damping factor.
+    """
+    loaded = _read(os.path.join(directory, RANKS_FILE))
+    if loaded is None:
+        return None
+    header, blobs = loaded
+    if header.get("fingerprint") != corpus_fingerprint or header.get("damping") != damping_factor:
+        return None
+    try:
+        (ranks,) = blobs
+        return ranks.cast("d")
+    except (ValueError, TypeError):
+        return None
+
+
+def top_pages(graph, ranks, k):
+    """
+    Returns the `k` highest-ranked (page, rank) pairs, best first.
+    """
+    best = heapq.nlargest(k, range(len(graph)), key=ranks.__getitem__)
+    return [(graph.pages[page], ranks[page]) for page in best]
@@ -0,0 +1,319 @@
+import random
+
+import pytest
+from pagerank import *
+from benchmark import GENERATORS, max_difference, preferential_corpus, write_corpus
+from crawler import crawl_graph, crawl_parallel
+import linkgraph
+import solvers
+import store
+
+
+CORPUS = {
+    "1.html": {"2.html"},
+    "2.html": {"1.html", "3.html"},
+    "3.html": {"2.html", "4.html"},
+    "4.html": {"2.html"},
+    "5.html": set(),
+}
+
+
+def random_corpus(n, seed=0, dangling=0.2):
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(n)]
+    corpus = {}
+    for page in pages:
+        if rng.random() < dangling:
+            corpus[page] = set()
+        else:
+            corpus[page] = set(rng.sample(pages, rng.randint(1, 4))) - {page}
+    return corpus
+
+
+def assert_close(ranks, expected, tolerance):
+    assert ranks.keys() == expected.keys()
+    for page in ranks:
+        assert ranks[page] == pytest.approx(expected[page], abs=tolerance)
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    if request.param == "numpy" and linkgraph.np is None:
+        pytest.skip("numpy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(linkgraph, "np", None)
+        monkeypatch.setattr(solvers, "np", None)
+    return request.param
+
+
+def test_sparse_matches_dict_engine(engine):
+    for corpus in (CORPUS, random_corpus(60)):
+        ranks = iterate_pagerank(corpus, DAMPING)
+        assert_close(ranks, iterate_pagerank(corpus, DAMPING, engine="dict"), 1e-9)
+        assert sum(ranks.values()) == pytest.approx(1)
+
+
+def test_sparse_crawled_corpus(engine):
+    corpus = crawl("corpus0")
+    assert_close(iterate_pagerank(corpus, DAMPING),
+                 iterate_pagerank(corpus, DAMPING, engine="dict"), 1e-9)
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        iterate_pagerank(CORPUS, DAMPING, engine="gpu")
+
+
+def test_sample_pagerank_agrees_with_iteration():
+    random.seed(0)
+    corpus = crawl("corpus2")
+    ranks = sample_pagerank(corpus, DAMPING, 100000)
+    assert sum(ranks.values()) == pytest.approx(1)
+    assert_close(ranks, iterate_pagerank(corpus, DAMPING), 0.01)
+
+
+def test_sample_pagerank_batched(engine):
+    corpus = random_corpus(40, dangling=0.3)
+    ranks = sample_pagerank_batched(corpus, DAMPING, 200000, seed=1)
+    assert sum(ranks.values()) == pytest.approx(1)
+    assert_close(ranks, iterate_pagerank(corpus, DAMPING), 0.01)
+    assert ranks == sample_pagerank_batched(corpus, DAMPING, 200000, seed=1)
+
+
+def test_sample_pagerank_batched_is_unbiased(engine):
+    # with SAMPLES over 1024 walkers each walker only counts about 10 steps
+    corpus = preferential_corpus(2000)
+    expected = iterate_pagerank(corpus, DAMPING, solver="power", tolerance=1e-10)
+    top = max(expected, key=expected.get)
+    estimates = [sample_pagerank_batched(corpus, DAMPING, SAMPLES, seed=seed)[top] for seed in range(20)]
+    assert sum(estimates) / len(estimates) == pytest.approx(expected[top], abs=0.006)
+
+
+def test_batched_walks_without_links():
+    graph = linkgraph.LinkGraph.from_corpus({"a": set(), "b": set()})
+    assert sum(linkgraph.batched_walks(graph, DAMPING, 1000, walkers=16, seed=0)) == 1000
+
+
+def test_parallel_sample_pagerank_is_reproducible():
+    corpus = crawl("corpus1")
+    stats = {}
+    ranks = parallel_sample_pagerank(corpus, DAMPING, 60000, workers=3, seed=7, stats=stats)
+    assert sum(ranks.values()) == pytest.approx(1)
+    assert_close(ranks, iterate_pagerank(corpus, DAMPING), 0.015)
+    assert stats["workers"] == 3
+    assert stats["steps_per_second_per_core"] > 0
+    assert ranks == parallel_sample_pagerank(corpus, DAMPING, 60000, workers=3, seed=7)
+    assert ranks != parallel_sample_pagerank(corpus, DAMPING, 60000, workers=3, seed=8)
+
+
+def test_parallel_sample_pagerank_in_process():
+    corpus = crawl("corpus0")
+    assert parallel_sample_pagerank(corpus, DAMPING, 5000, workers=1, seed=1) == \
+        parallel_sample_pagerank(corpus, DAMPING, 5000, workers=1, seed=1)
+
+
+def exact_ranks(corpus):
+    graph = linkgraph.LinkGraph.from_corpus(corpus)
+    return graph.to_dict(linkgraph.power_iteration(graph, DAMPING, tolerance=1e-12))
+
+
+@pytest.mark.parametrize("solver", solvers.SOLVERS)
+def test_solvers_converge(engine, solver):
+    for corpus in (CORPUS, random_corpus(300, seed=2)):
+        stats = {}
+        ranks = iterate_pagerank(corpus, DAMPING, solver=solver, tolerance=1e-10, stats=stats)
+        assert_close(ranks, exact_ranks(corpus), 1e-9)
+        assert stats["converged"]
+        assert stats["iterations"] == len(stats["residuals"]) == len(stats["seconds"])
+        assert stats["residuals"][-1] < 1e-10
+
+
+def test_solver_options():
+    corpus = random_corpus(300, seed=2)
+    iterations = {}
+    for solver in solvers.SOLVERS:
+        stats = {}
+        iterate_pagerank(corpus, DAMPING, solver=solver, tolerance=1e-10, stats=stats)
+        iterations[solver] = stats["iterations"]
+    assert iterations["gauss-seidel"] < iterations["power"]
+
+    # the error of a slowly damped cycle is one complex eigenvalue pair
+    cycle = {"a": {"b"}, "b": {"c"}, "c": {"a", "d"}, "d": {"a"}}
+    for solver in solvers.SOLVERS:
+        stats = {}
+        iterate_pagerank(cycle, 0.99, solver=solver, tolerance=1e-10, stats=stats)
+        iterations[solver] = stats["iterations"]
+    assert iterations["quadratic"] < iterations["power"] / 2
+
+    stats = {}
+    iterate_pagerank(corpus, DAMPING, solver="power", tolerance=1e-10, max_iterations=5, stats=stats)
+    assert stats["iterations"] == 5 and not stats["converged"]
+    with pytest.raises(ValueError):
+        iterate_pagerank(corpus, DAMPING, solver="jacobi")
+    with pytest.raises(ValueError):
+        iterate_pagerank(corpus, DAMPING, engine="dict", solver="power")
+
+
+def test_transition_model_personalization():
+    distribution = transition_model(CORPUS, "1.html", DAMPING, {"3.html": 1, "4.html": 3})
+    assert distribution["2.html"] == pytest.approx(DAMPING)
+    assert distribution["3.html"] == pytest.approx((1 - DAMPING) / 4)
+    assert distribution["4.html"] == pytest.approx(3 * (1 - DAMPING) / 4)
+    assert transition_model(CORPUS, "5.html", DAMPING, {"3.html": 1}) == {
+        "1.html": 0, "2.html": 0, "3.html": 1, "4.html": 0, "5.html": 0,
+    }
+    assert transition_model(CORPUS, "1.html", DAMPING, {page: 1 for page in CORPUS}) == \
+        pytest.approx(transition_model(CORPUS, "1.html", DAMPING))
+
+
+def test_personalized_pagerank(engine):
+    corpus = random_corpus(200, seed=5)
+    seed_sets = [["1.html"], ["2.html", "3.html", "4.html"], list(corpus)]
+    batched = personalized_pagerank(corpus, DAMPING, seed_sets)
+    for seeds, ranks in zip(seed_sets, batched):
+        expected = iterate_pagerank(corpus, DAMPING, solver="power", tolerance=1e-10,
+                                    personalization=dict.fromkeys(seeds, 1))
+        assert_close(ranks, expected, 1e-8)
+        assert sum(ranks.values()) == pytest.approx(1)
+    assert_close(batched[2], exact_ranks(corpus), 1e-8)
+    assert max(batched[0], key=batched[0].get) == "1.html"
+
+    solved = iterate_pagerank(corpus, DAMPING, solver="gauss-seidel", tolerance=1e-10,
+                              personalization={"1.html": 1})
+    assert_close(solved, batched[0], 1e-8)
+
+    top = personalized_pagerank(corpus, DAMPING, seed_sets, k=5)
+    for best, ranks in zip(top, batched):
+        assert best == top_pages(ranks, 5)
+        assert [rank for _, rank in best] == sorted(ranks.values(), reverse=True)[:5]
+
+
+def test_personalization_errors():
+    with pytest.raises(ValueError):
+        iterate_pagerank(CORPUS, DAMPING, personalization={"missing.html": 1})
+    with pytest.raises(ValueError):
+        iterate_pagerank(CORPUS, DAMPING, personalization={"1.html": 0})
+    with pytest.raises(ValueError):
+        iterate_pagerank(CORPUS, DAMPING, engine="dict", personalization={"1.html": 1})
+    with pytest.raises(ValueError):
+        transition_model(CORPUS, "1.html", DAMPING, {"missing.html": 1})
+    with pytest.raises(ValueError):
+        transition_model(CORPUS, "1.html", DAMPING, {"1.html": -1, "2.html": 2})
+
+
+def test_update_pagerank_applies_diff():
+    ranks = exact_ranks(CORPUS)
+    corpus, updated = update_pagerank(
+        CORPUS, ranks, DAMPING,
+        added_pages=["6.html"], removed_pages=["4.html"],
+        added_links=[("6.html", "1.html"), ("5.html", "6.html"), ("1.html", "missing.html")],
+        removed_links=[("2.html", "1.html")],
+    )
+    assert corpus == {
+        "1.html": {"2.html"},
+        "2.html": {"3.html"},
+        "3.html": {"2.html"},
+        "5.html": {"6.html"},
+        "6.html": {"1.html"},
+    }
+    assert CORPUS["2.html"] == {"1.html", "3.html"}
+    assert_close(updated, exact_ranks(corpus), 1e-4)
+
+
+def test_update_pagerank_small_edit_is_local(engine):
+    corpus = random_corpus(2000, seed=3)
+    ranks = exact_ranks(corpus)
+    stats = {}
+    page = "10.html"
+    link = next(p for p in corpus if p != page and p not in corpus[page])
+    new_corpus, updated = update_pagerank(corpus, ranks, DAMPING,
+                                          added_links=[(page, link)], stats=stats)
+    expected = exact_ranks(new_corpus)
+    assert sum(abs(updated[p] - expected[p]) for p in expected) < 1e-3
+    # far fewer pushes than one pass of a full power iteration touches pages
+    assert stats["pushes"] < len(corpus)
+
+
+@pytest.mark.parametrize("directory", ["corpus0", "corpus1", "corpus2"])
+def test_crawl_parallel_matches_crawl(directory):
+    assert crawl_parallel(directory, workers=2) == crawl_serial(directory) == crawl(directory)
+    graph = crawl_graph(directory, workers=2, processes=True)
+    assert graph.pages == sorted(crawl(directory))
+
+
+def test_crawl_parallel_synthetic(tmp_path):
+    corpus = random_corpus(50)
+    corpus["empty.html"] = set()
+    write_corpus(str(tmp_path), corpus)
+    (tmp_path / "empty.html").write_text("")
+    assert crawl_parallel(str(tmp_path)) == crawl_serial(str(tmp_path)) == corpus
+
+
+@pytest.mark.parametrize("filename", [store.GRAPH_FILE, store.RANKS_FILE])
+@pytest.mark.parametrize("size", [4, 12, 0.5, -8])
+def test_damaged_store_is_recomputed(tmp_path, filename, size):
+    store_dir = tmp_path / "store"
+    expected = stored_pagerank("corpus2", DAMPING, str(store_dir))[1]
+    path = store_dir / filename
+    data = path.read_bytes()
+    path.write_bytes(data[:int(size * len(data)) if isinstance(size, float) else size])
+
+    graph, ranks, recomputed = stored_pagerank("corpus2", DAMPING, str(store_dir))
+    assert recomputed == (filename == store.RANKS_FILE)
+    assert graph.pages == sorted(crawl("corpus2"))
+    assert list(ranks) == list(expected)
+    fingerprint = store.fingerprint("corpus2")
+    assert store.load_graph(str(store_dir), fingerprint) is not None
+    assert store.load_ranks(str(store_dir), DAMPING, fingerprint) is not None
+
+
+@pytest.mark.parametrize("generator", GENERATORS)
+def test_generated_corpora(generator, tmp_path):
+    corpus = GENERATORS[generator](300, seed=4)
+    assert len(corpus) == 300
+    assert all(page not in links and links <= corpus.keys() for page, links in corpus.items())
+    assert corpus == GENERATORS[generator](300, seed=4)
+    write_corpus(str(tmp_path), corpus)
+    assert crawl(str(tmp_path)) == corpus
+
+    random.seed(0)
+    assert max_difference(sample_pagerank(corpus, DAMPING, 30000), iterate_pagerank(corpus, DAMPING)) < 0.01
+
+
+def test_generator_shapes():
+    corpus = GENERATORS["erdos-renyi"](2000, degree=5)
+    assert 4.5 < sum(map(len, corpus.values())) / len(corpus) < 5.5
+    dangling = GENERATORS["dangling"](2000, dangling=0.7)
+    assert 0.65 < sum(not links for links in dangling.values()) / len(dangling) < 0.75
+    preferential = GENERATORS["preferential"](2000, links=3)
+    in_degree = {page: 0 for page in preferential}
+    for links in preferential.values():
+        for link in links:
+            in_degree[link] += 1
+    assert all(len(links) == 3 for links in list(preferential.values())[3:])
+    # early pages collect far more links than an even spread would give
+    assert max(in_degree.values()) > 50
+
+
+def test_stored_pagerank(tmp_path):
+    corpus_dir = tmp_path / "corpus"
+    store_dir = str(tmp_path / "store")
+    write_corpus(str(corpus_dir), crawl("corpus2"))
+
+    graph, ranks, recomputed = stored_pagerank(str(corpus_dir), DAMPING, store_dir)
+    assert recomputed
+    expected = iterate_pagerank(crawl(str(corpus_dir)), DAMPING)
+    assert_close(graph.to_dict(ranks), expected, 1e-12)
+
+    graph, ranks, recomputed = stored_pagerank(str(corpus_dir), DAMPING, store_dir)
+    assert not recomputed
+    assert isinstance(ranks, memoryview)
+    assert_close(graph.to_dict(ranks), expected, 1e-12)
+    top = store.top_pages(graph, ranks, 3)
+    assert [page for page, _ in top] == sorted(expected, key=expected.get, reverse=True)[:3]
+
+    assert stored_pagerank(str(corpus_dir), 0.5, store_dir)[2]
+    (corpus_dir / "new.html").write_text('<a href="ai.html">ai</a>')
+    graph, ranks, recomputed = stored_pagerank(str(corpus_dir), DAMPING, store_dir)
+    assert recomputed
+    assert "new.html" in graph.pages
@@ -0,0 +1,224 @@
+"""
+Benchmarks for the tictactoe AI.
+
+Usage: python benchmark.py memo
+       python benchmark.py alphabeta
+       python benchmark.py bitboard
+       python benchmark.py book
+       python benchmark.py mnk [--size M N] [-k K] [--time-limit T] [--moves N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import bitboard
+import book
+import mnk
+import tictactoe
+
+
+def reachable(board=None, seen=None):
+    """
+    Yields every position reachable from `board` (the empty board by
+    default) once.
+    """
+    board = board or tictactoe.initial_state()
+    seen = set() if seen is None else seen
+    key = tictactoe.board_key(board)
+    if key in seen:
+        return
+    seen.add(key)
+    yield board
+    if not tictactoe.terminal(board):
+        for action in tictactoe.actions(board):
+            yield from reachable(tictactoe.result(board, action), seen)
+
+
+def count_calls(module, name):
+    """
+    Replace `module.name` by a wrapper counting its calls, including its
+    recursive ones, and return the dict holding the count.
+    """
+    function = getattr(module, name)
+    counter = {"calls": 0}
+
+    def counted(*args, **kwargs):
+        counter["calls"] += 1
+        return function(*args, **kwargs)
+
+    setattr(module, name, counted)
+    counter["restore"] = lambda: setattr(module, name, function)
+    return counter
+
+
+def benchmark_memo(args):
+    board = tictactoe.initial_state()
+
+    counter = count_calls(tictactoe, "minimax2")
+    start = time.perf_counter()
+    tictactoe.exhaustive_minimax(board)
+    seconds = time.perf_counter() - start
+    counter["restore"]()
+    print(f"  {'exhaustive':>20}: {seconds * 1000:9.2f}ms, {counter['calls']:7} nodes")
+
+    for symmetry in (False, True):
+        tictactoe.transpositions[symmetry].clear()
+        for label in ("cold", "warm"):
+            stats = {}
+            start = time.perf_counter()
+            tictactoe.memo_minimax(board, symmetry, stats)
+            seconds = time.perf_counter() - start
+            name = f"memo {'symmetric ' if symmetry else ''}{label}"
+            print(f"  {name:>20}: {seconds * 1000:9.2f}ms, {stats['searched']:7} nodes, "
+                  f"hit rate {stats['hit_rate']:.1%}, {stats['table_size']} positions stored")
+
+
+def benchmark_alphabeta(args):
+    positions = [board for board in reachable() if not tictactoe.terminal(board)]
+    print(f"{len(positions)} reachable positions with a move to make")
+
+    counter = count_calls(tictactoe, "minimax2")
+    start = time.perf_counter()
+    expected = [tictactoe.minimax2(tictactoe.result(board, tictactoe.exhaustive_minimax(board)))
+                for board in positions]
+    seconds = time.perf_counter() - start
+    counter["restore"]()
+    print(f"  {'exhaustive':>10}: {seconds:7.2f}s, {counter['calls']:9} nodes")
+
+    nodes = 0
+    chosen = []
+    start = time.perf_counter()
+    for board in positions:
+        stats = {}
+        chosen.append(tictactoe.alphabeta_minimax(board, stats))
+        nodes += stats["nodes"]
+    seconds = time.perf_counter() - start
+    print(f"  {'alpha-beta':>10}: {seconds:7.2f}s, {nodes:9} nodes")
+
+    table = tictactoe.transpositions[True]
+    wrong = sum(
+        tictactoe.memo_value(tictactoe.result(board, action), table) != value
+        for board, action, value in zip(positions, chosen, expected)
+    )
+    print(f"  {wrong} positions where alpha-beta chose a worse move")
+
+
+def walk_lists(board):
+    """
+    Returns the number of nodes in the full game tree below `board`,
+    using the list-of-lists functions.
+    """
+    tictactoe.player(board)
+    if tictactoe.terminal(board):
+        tictactoe.utility(board)
+        return 1
+    return 1 + sum(walk_lists(tictactoe.result(board, action)) for action in tictactoe.actions(board))
+
+
+def walk_bits(x, o):
+    """
+    Returns the number of nodes in the full game tree below (x, o),
+    using the bitboard functions.
+    """
+    bitboard.player(x, o)
+    if bitboard.terminal(x, o):
+        bitboard.utility(x, o)
+        return 1
+    return 1 + sum(walk_bits(*bitboard.result(x, o, bit)) for bit in bitboard.moves(x, o))
+
+
+def benchmark_bitboard(args):
+    board = tictactoe.initial_state()
+    for label, run in (
+        ("lists", lambda: walk_lists(board)),
+        ("bitboard", lambda: walk_bits(*bitboard.from_board(board))),
+    ):
+        start = time.perf_counter()
+        nodes = run()
+        seconds = time.perf_counter() - start
+        print(f"  {label:>8}: {nodes} positions in {seconds:6.2f}s, {nodes / seconds:12,.0f} positions/sec")
+
+    for label, run in (
+        ("alpha-beta lists", lambda: tictactoe.alphabeta_minimax(board)),
+        ("alpha-beta bitboard", lambda: bitboard.best_action(board)),
+    ):
+        start = time.perf_counter()
+        action = run()
+        print(f"  {label:>20}: {action} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+def benchmark_book(args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "solution.bin")
+        start = time.perf_counter()
+        count = book.generate(path)
+        print(f"  generate: {count} positions in {(time.perf_counter() - start) * 1000:.1f}ms, "
+              f"{os.path.getsize(path)} bytes")
+        start = time.perf_counter()
+        book.load(path)
+        print(f"      load: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    positions = [board for board in reachable() if not tictactoe.terminal(board)]
+    for label, run in (
+        ("book", tictactoe.minimax),
+        ("memo warm", tictactoe.memo_minimax),
+        ("alpha-beta", tictactoe.alphabeta_minimax),
+        ("bitboard", bitboard.best_action),
+    ):
+        run(positions[0])
+        start = time.perf_counter()
+        for board in positions:
+            run(board)
+        seconds = time.perf_counter() - start
+        print(f"  {label:>10}: {seconds / len(positions) * 1e6:9.1f}us per move")
+
+
+def benchmark_mnk(args):
+    m, n = args.size
+    board = tictactoe.initial_state(m, n)
+    print(f"{m}x{n}, {args.k} in a row, {args.time_limit}s per move")
+    slowest = 0.0
+    for turn in range(args.moves):
+        if tictactoe.terminal(board, args.k):
+            break
+        stats = {}
+        move = mnk.best_move(board, args.k, args.time_limit, stats=stats)
+        slowest = max(slowest, stats["seconds"])
+        print(f"  {turn + 1:3} {tictactoe.player(board)} {move}: depth {stats['depth']:2}, "
+              f"{stats['nodes']:8} nodes, {stats['nodes'] / max(stats['seconds'], 1e-9):9,.0f} nodes/sec, "
+              f"{stats['seconds']:.2f}s")
+        board = tictactoe.result(board, move)
+    print(f"  winner: {tictactoe.winner(board, args.k)}, slowest move {slowest:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for tictactoe.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    memo_parser = commands.add_parser("memo", help="first move with and without a transposition table")
+    memo_parser.set_defaults(run=benchmark_memo)
+
+    alphabeta_parser = commands.add_parser("alphabeta", help="alpha-beta vs minimax2 from every position")
+    alphabeta_parser.set_defaults(run=benchmark_alphabeta)
+
+    bitboard_parser = commands.add_parser("bitboard", help="positions/sec on lists vs bitboards")
+    bitboard_parser.set_defaults(run=benchmark_bitboard)
+
+    book_parser = commands.add_parser("book", help="solution table vs search, per move")
+    book_parser.set_defaults(run=benchmark_book)
+
+    mnk_parser = commands.add_parser("mnk", help="self-play on larger boards under a time budget")
+    mnk_parser.add_argument("--size", type=int, nargs=2, default=[15, 15], metavar=("M", "N"))
+    mnk_parser.add_argument("-k", type=int, default=5)
+    mnk_parser.add_argument("--time-limit", type=float, default=1.0)
+    mnk_parser.add_argument("--moves", type=int, default=20)
+    mnk_parser.set_defaults(run=benchmark_mnk)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Tic Tac Toe on bitboards.
+
+A position is a pair of 9-bit masks (x, o), one bit per cell, with cell
+(i, j) at bit 3 * i + j. Whose turn it is follows from the two
+popcounts, a move is a single OR, and a side has won if its mask covers
+one of the 8 LINES, which is looked up in a 512-entry table built from
+them once.
+"""
+
+import math
+
+from tictactoe import EMPTY, MOVE_ORDER, O, X
+
+FULL = (1 << 9) - 1
+
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+]
+
+# WINS[mask] is True if `mask` covers a whole line
+WINS = [any(mask & line == line for line in LINES) for mask in range(1 << 9)]
+
+# Bits in alpha-beta's move order: center, corners, edges
+ORDERED_BITS = [1 << (3 * i + j) for i, j in MOVE_ORDER]
+
+
+def from_board(board):
+    """
+    Returns the (x, o) masks of a list-of-lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board of the (x, o) masks.
+    """
+    return [
+        [X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY for j in range(3)]
+        for i in range(3)
+    ]
+
+
+def player(x, o):
+    return X if x.bit_count() == o.bit_count() else O
+
+
+def moves(x, o):
+    """
+    Yields the bit of every empty cell, lowest first.
+    """
+    empty = ~(x | o) & FULL
+    while empty:
+        bit = empty & -empty
+        yield bit
+        empty ^= bit
+
+
+def action(bit):
+    """
+    Returns the (i, j) cell of a move bit.
+    """
+    return divmod(bit.bit_length() - 1, 3)
+
+
+def result(x, o, bit):
+    """
+    Returns the masks after the current player takes the cell `bit`.
+    """
+    if (x | o) & bit or not bit & FULL:
+        raise ValueError("invalid move")
+    if player(x, o) == X:
+        return x | bit, o
+    return x, o | bit
+
+
+def utility(x, o):
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    return 0
+
+
+def terminal(x, o):
+    return WINS[x] or WINS[o] or x | o == FULL
+
+
+def minimax(x, o):
+    """
+    Returns an optimal move bit for the current player, or None if the
+    game is over, by alpha-beta search in `ORDERED_BITS` order.
+    """
+    if terminal(x, o):
+        return None
+    maximizing = player(x, o) == X
+    best_bit = None
+    alpha, beta = -math.inf, math.inf
+    for bit in ORDERED_BITS:
+        if (x | o) & bit:
+            continue
+        if maximizing:
+            value = _alphabeta(x | bit, o, False, alpha, beta)
+            if value > alpha:
+                alpha, best_bit = value, bit
+        else:
+            value = _alphabeta(x, o | bit, True, alpha, beta)
+            if value < beta:
+                beta, best_bit = value, bit
+        if alpha >= 1 or beta <= -1:
+            break
+    return best_bit
+
+
+def _alphabeta(x, o, x_to_move, alpha, beta):
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    occupied = x | o
+    if occupied == FULL:
+        return 0
+    if x_to_move:
+        value = -1
+        for bit in ORDERED_BITS:
+            if not occupied & bit:
+                value = max(value, _alphabeta(x | bit, o, False, alpha, beta))
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    break
+    else:
+        value = 1
+        for bit in ORDERED_BITS:
+            if not occupied & bit:
+                value = min(value, _alphabeta(x, o | bit, True, alpha, beta))
+                beta = min(beta, value)
+                if alpha >= beta:
+                    break
+    return value
+
+
+def best_action(board):
+    """
+    Returns an optimal (i, j) action for a list-of-lists board, as
+    `tictactoe.minimax` does, searched on bitboards.
+    """
+    bit = minimax(*from_board(board))
+    return None if bit is None else action(bit)
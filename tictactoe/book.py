@@ -0,0 +1,131 @@
+"""
+Precomputed perfect play for every reachable Tic Tac Toe position.
+
+The table has one 16-bit entry for each of the 3^9 boards, at the index
+that reads the board as a base-3 number (cell 3 * i + j is digit
+3 * i + j: 0 empty, 1 X, 2 O). Bits 0-8 of an entry are the cells of
+every optimal move, bits 9-10 the minimax value plus one, and bit 11 is
+set for reachable positions. It is written by `generate` (run this
+module) and read back on the first `lookup`. A missing table, or one
+built for other winning lines or another format, is ignored, and the
+caller searches instead.
+
+Usage: python book.py [path]
+"""
+
+import hashlib
+import os
+import sys
+from array import array
+
+MAGIC = b"TTTBOOK1"
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "solution.bin")
+
+POSITIONS = 3 ** 9
+REACHABLE = 1 << 11
+
+# Winning lines the table was solved for, as in bitboard.LINES; a table
+# whose fingerprint does not match them is stale
+LINES = [0b000000111, 0b000111000, 0b111000000, 0b001001001,
+         0b010010010, 0b100100100, 0b100010001, 0b001010100]
+
+# Table read by `load`, None until the first lookup and False if missing
+_table = None
+
+
+def fingerprint():
+    return hashlib.sha256(repr((MAGIC, LINES)).encode("ascii")).digest()
+
+
+def index(board):
+    """
+    Returns the base-3 index of a list-of-lists board.
+    """
+    position = 0
+    for row in reversed(board):
+        for cell in reversed(row):
+            position = 3 * position + (1 if cell == "X" else 2 if cell == "O" else 0)
+    return position
+
+
+def load(path=TABLE_FILE):
+    """
+    Returns the table at `path` as an array of entries, or None if it is
+    missing, truncated or stale.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    header = len(MAGIC) + 32
+    if data[:len(MAGIC)] != MAGIC or data[len(MAGIC):header] != fingerprint():
+        return None
+    if len(data) != header + 2 * POSITIONS:
+        return None
+    table = array("H")
+    table.frombytes(data[header:])
+    if sys.byteorder == "big":
+        table.byteswap()
+    return table
+
+
+def lookup(board):
+    """
+    Returns (value, [optimal actions]) for `board` from the table, or
+    None if there is no usable table or the position is not reachable.
+    """
+    global _table
+    if _table is None:
+        _table = load() or False
+    if not _table:
+        return None
+    entry = _table[index(board)]
+    if not entry & REACHABLE:
+        return None
+    moves = [divmod(cell, 3) for cell in range(9) if entry >> cell & 1]
+    return (entry >> 9 & 3) - 1, moves
+
+
+def generate(path=TABLE_FILE):
+    """
+    Solve every reachable position and write the table to `path`.
+    Returns the number of reachable positions.
+    """
+    import bitboard
+
+    if bitboard.LINES != LINES:
+        raise ValueError("book.LINES does not match bitboard.LINES")
+
+    table = array("H", [0]) * POSITIONS
+    values = {}
+
+    def solve(x, o):
+        if (x, o) in values:
+            return values[(x, o)]
+        if bitboard.terminal(x, o):
+            value, best = bitboard.utility(x, o), 0
+        else:
+            children = {bit: solve(*bitboard.result(x, o, bit)) for bit in bitboard.moves(x, o)}
+            pick = max if bitboard.player(x, o) == bitboard.X else min
+            value = pick(children.values())
+            best = sum(bit for bit, child in children.items() if child == value)
+        values[(x, o)] = value
+        table[index(bitboard.to_board(x, o))] = REACHABLE | (value + 1) << 9 | best
+        return value
+
+    solve(0, 0)
+    if sys.byteorder == "big":
+        table.byteswap()
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(MAGIC)
+        f.write(fingerprint())
+        f.write(table.tobytes())
+    os.replace(partial, path)
+    return len(values)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else TABLE_FILE
+    print(f"Solved {generate(path)} positions into {path}")
@@ -0,0 +1,270 @@
+"""
+Search for m,n,k-games: k in a row on an m x n board, such as 4x4
+Tic Tac Toe or 15x15 gomoku.
+
+A Position keeps, for every run of k cells (a window) that fits on the
+board, how many X and O stones it holds. Playing or undoing a stone
+only touches the windows through its cell, so the win check and the
+heuristic score are updated in O(k) rather than recomputed. A window
+holding `count` stones of one side only scores 10 ** (count - 1) for
+that side; the evaluation is the sum over all windows.
+
+`best_move` runs iterative-deepening alpha-beta (negamax) until a time
+budget runs out, and returns the best move of the deepest search that
+finished. On boards of more than SMALL_BOARD cells, only the empty
+cells within NEIGHBOURHOOD of a stone are considered.
+"""
+
+import time
+from functools import lru_cache
+
+EMPTY, X_STONE, O_STONE = 0, 1, 2
+
+# Seconds `best_move` may search by default
+TIME_LIMIT = 1.0
+
+# Boards with at most this many cells consider every empty cell
+SMALL_BOARD = 16
+
+# Distance from a stone within which larger boards consider moves
+NEIGHBOURHOOD = 1
+
+# Nodes searched between two looks at the clock
+CLOCK_INTERVAL = 256
+
+
+class Timeout(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def windows(m, n, k):
+    """
+    Returns (windows, cell_windows) for an m x n board: every run of k
+    cells in a row, column or diagonal as a tuple of cell indices
+    (i * n + j), and for each cell the indices of the windows through it.
+    """
+    runs = []
+    for i in range(m):
+        for j in range(n):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                if 0 <= end_i < m and 0 <= end_j < n:
+                    runs.append(tuple((i + di * step) * n + j + dj * step for step in range(k)))
+    cell_windows = [[] for _ in range(m * n)]
+    for w, run in enumerate(runs):
+        for cell in run:
+            cell_windows[cell].append(w)
+    return runs, [tuple(ids) for ids in cell_windows]
+
+
+class Position():
+    """
+    An m x n board with k in a row to win, updated in place by `play`
+    and `undo`.
+    """
+
+    def __init__(self, m, n, k):
+        if k > max(m, n):
+            raise ValueError(f"{k} in a row does not fit on a {m}x{n} board")
+        self.m, self.n, self.k = m, n, k
+        self.windows, self.cell_windows = windows(m, n, k)
+        self.weights = [0] + [10 ** count for count in range(k)]
+        self.cells = [EMPTY] * (m * n)
+        self.x_counts = [0] * len(self.windows)
+        self.o_counts = [0] * len(self.windows)
+        self.score = 0
+        self.turn = X_STONE
+        self.winner = EMPTY
+        self.history = []
+
+    @classmethod
+    def from_board(cls, board, k):
+        """
+        Returns the position of a list-of-lists board of "X", "O" and
+        EMPTY cells, with X to move when both sides have as many stones.
+        """
+        position = cls(len(board), len(board[0]), k)
+        stones = [
+            (i * position.n + j, X_STONE if cell == "X" else O_STONE)
+            for i, row in enumerate(board) for j, cell in enumerate(row) if cell in ("X", "O")
+        ]
+        for cell, stone in stones:
+            position.turn = stone
+            position.play(cell)
+        position.history.clear()
+        xs = sum(stone == X_STONE for _, stone in stones)
+        position.turn = X_STONE if xs == len(stones) - xs else O_STONE
+        return position
+
+    def _window_value(self, w):
+        x, o = self.x_counts[w], self.o_counts[w]
+        if o == 0:
+            return self.weights[x]
+        if x == 0:
+            return -self.weights[o]
+        return 0
+
+    def play(self, cell):
+        """
+        Put the stone of the side to move on `cell`, updating the score
+        and the winner from the windows through it.
+        """
+        if self.cells[cell] != EMPTY:
+            raise ValueError(f"cell {cell} is taken")
+        stone = self.turn
+        counts = self.x_counts if stone == X_STONE else self.o_counts
+        self.history.append((cell, self.winner))
+        self.cells[cell] = stone
+        for w in self.cell_windows[cell]:
+            before = self._window_value(w)
+            counts[w] += 1
+            self.score += self._window_value(w) - before
+            if counts[w] == self.k:
+                self.winner = stone
+        self.turn = O_STONE if stone == X_STONE else X_STONE
+
+    def undo(self):
+        cell, winner = self.history.pop()
+        stone = self.cells[cell]
+        counts = self.x_counts if stone == X_STONE else self.o_counts
+        for w in self.cell_windows[cell]:
+            before = self._window_value(w)
+            counts[w] -= 1
+            self.score += self._window_value(w) - before
+        self.cells[cell] = EMPTY
+        self.winner = winner
+        self.turn = stone
+
+    def full(self):
+        return EMPTY not in self.cells
+
+    def candidates(self):
+        """
+        Returns the empty cells worth searching, most promising first:
+        those through which the most weight of open windows passes.
+        """
+        cells = self.cells
+        if len(cells) <= SMALL_BOARD:
+            moves = [cell for cell, stone in enumerate(cells) if stone == EMPTY]
+        elif not any(cells):
+            # on an empty large board only the center is worth a look
+            return [(self.m // 2) * self.n + self.n // 2]
+        else:
+            near = set()
+            for cell, stone in enumerate(cells):
+                if stone == EMPTY:
+                    continue
+                i, j = divmod(cell, self.n)
+                for di in range(-NEIGHBOURHOOD, NEIGHBOURHOOD + 1):
+                    for dj in range(-NEIGHBOURHOOD, NEIGHBOURHOOD + 1):
+                        a, b = i + di, j + dj
+                        if 0 <= a < self.m and 0 <= b < self.n and cells[a * self.n + b] == EMPTY:
+                            near.add(a * self.n + b)
+            moves = list(near) or [cell for cell, stone in enumerate(cells) if stone == EMPTY]
+        moves.sort(key=self._urgency, reverse=True)
+        return moves
+
+    def _urgency(self, cell):
+        urgency = 0
+        for w in self.cell_windows[cell]:
+            x, o = self.x_counts[w], self.o_counts[w]
+            if o == 0:
+                urgency += self.weights[x] + 1
+            if x == 0:
+                urgency += self.weights[o] + 1
+        return urgency
+
+
+def win_score(position):
+    """
+    Returns the score of a won game, above any heuristic score.
+    """
+    return 10 ** (position.k + 2) * len(position.windows)
+
+
+def best_move(board, k, time_limit=TIME_LIMIT, max_depth=None, stats=None):
+    """
+    Returns the (i, j) move for the side to move on a list-of-lists
+    board with `k` in a row to win, or None if the game is over.
+
+    The position is searched one ply deeper at a time until the depth
+    reaches `max_depth` (by default the number of empty cells), a forced
+    result is found, or `time_limit` seconds have passed; the search in
+    progress is then abandoned. If `stats` is a dictionary, the depth
+    completed, the nodes searched and the seconds taken are stored in it.
+    """
+    start = time.perf_counter()
+    position = Position.from_board(board, k)
+    empties = position.cells.count(EMPTY)
+    if position.winner or not empties:
+        return None
+    deadline = start + time_limit if time_limit is not None else None
+    max_depth = min(max_depth or empties, empties)
+    win = win_score(position)
+    counts = {"nodes": 0}
+
+    moves = position.candidates()
+    best, depth = moves[0], 0
+    if len(moves) == 1:
+        max_depth = 0
+    try:
+        for depth_limit in range(1, max_depth + 1):
+            value, move = _root(position, moves, depth_limit, deadline, counts, win)
+            best, depth = move, depth_limit
+            # search the best move first next time
+            moves.remove(move)
+            moves.insert(0, move)
+            if abs(value) >= win - position.m * position.n:
+                break
+    except Timeout:
+        pass
+
+    if stats is not None:
+        stats["depth"] = depth
+        stats["nodes"] = counts["nodes"]
+        stats["seconds"] = time.perf_counter() - start
+    return divmod(best, position.n)
+
+
+def _root(position, moves, depth, deadline, counts, win):
+    alpha, beta = -win * 2, win * 2
+    best = moves[0]
+    for move in moves:
+        position.play(move)
+        try:
+            value = -_negamax(position, depth - 1, -beta, -alpha, deadline, counts, win)
+        finally:
+            position.undo()
+        if value > alpha:
+            alpha, best = value, move
+    return alpha, best
+
+
+def _negamax(position, depth, alpha, beta, deadline, counts, win):
+    """
+    Returns the value of `position` for the side to move, searched
+    `depth` plies deep with alpha-beta pruning.
+    """
+    counts["nodes"] += 1
+    if deadline is not None and counts["nodes"] % CLOCK_INTERVAL == 0 and time.perf_counter() > deadline:
+        raise Timeout
+    if position.winner:
+        # the side that just moved has won; sooner wins score higher
+        return -(win - len(position.history))
+    if depth == 0 or position.full():
+        if position.full():
+            return 0
+        return position.score if position.turn == X_STONE else -position.score
+
+    value = -win * 2
+    for move in position.candidates():
+        position.play(move)
+        try:
+            value = max(value, -_negamax(position, depth - 1, -beta, -alpha, deadline, counts, win))
+        finally:
+            position.undo()
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+    return value
@@ -5,7 +5,7 @@ a = Analysis(
     ['runner.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('solution.bin', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,200 @@
+import random
+
+import pytest
+from tictactoe import *
+from benchmark import reachable
+import bitboard
+import book
+import mnk
+import tictactoe
+
+
+def board_from(rows):
+    return [[EMPTY if cell == "-" else cell for cell in row] for row in rows]
+
+
+POSITIONS = [
+    board_from(["X--", "-O-", "---"]),
+    board_from(["XX-", "-O-", "--O"]),
+    board_from(["X-X", "-O-", "O--"]),
+    board_from(["-XX", "--O", "O-X"]),
+    board_from(["XO-", "-X-", "--O"]),
+]
+
+
+def test_reachable_positions():
+    assert sum(1 for _ in reachable()) == 5478
+
+
+@pytest.mark.parametrize("board", POSITIONS)
+@pytest.mark.parametrize("symmetry", [False, True])
+def test_memo_minimax_is_optimal(board, symmetry):
+    action = memo_minimax(board, symmetry)
+    assert minimax2(result(board, action)) == minimax2(board)
+
+
+def test_memo_minimax_stats():
+    tictactoe.transpositions[False].clear()
+    tictactoe.transpositions[True].clear()
+    stats = {}
+    memo_minimax(initial_state(), symmetry=False, stats=stats)
+    assert stats["searched"] == stats["table_size"] == 5477
+    assert stats["hits"] == stats["lookups"] - stats["searched"]
+    memo_minimax(initial_state(), symmetry=True, stats=stats)
+    assert stats["table_size"] == 764
+
+    stats = {}
+    assert minimax(initial_state()) in actions(initial_state())
+    memo_minimax(initial_state(), stats=stats)
+    assert stats["searched"] == 0 and stats["hit_rate"] == 1
+    assert memo_value(initial_state(), tictactoe.transpositions[True]) == 0
+
+
+def test_canonical_key():
+    key = board_key(board_from(["X--", "---", "---"]))
+    corners = ["X--------", "--X------", "------X--", "--------X"]
+    assert {canonical_key(corner) for corner in corners} == {canonical_key(key)}
+    assert canonical_key("-X-------") != canonical_key(key)
+    assert len({"".join("abcdefghi"[cell] for cell in symmetry) for symmetry in SYMMETRIES}) == 8
+
+
+def test_alphabeta_minimax_every_position():
+    table = tictactoe.transpositions[True]
+    for board in reachable():
+        action = alphabeta_minimax(board)
+        if terminal(board):
+            assert action is None
+        else:
+            assert memo_value(result(board, action), table) == memo_value(board, table)
+
+
+def test_alphabeta_prunes():
+    stats = {}
+    assert alphabeta_minimax(initial_state(), stats) == (1, 1)
+    assert stats["nodes"] < 20000
+    assert alphabeta(initial_state(), -math.inf, math.inf) == 0
+    assert ordered_actions(board_from(["X--", "-O-", "---"]))[:3] == [(0, 2), (2, 0), (2, 2)]
+
+
+def test_bitboard_matches_lists():
+    for board in reachable():
+        x, o = bitboard.from_board(board)
+        assert bitboard.to_board(x, o) == board
+        assert bitboard.player(x, o) == player(board)
+        assert bitboard.terminal(x, o) == terminal(board)
+        assert bitboard.utility(x, o) == utility(board)
+        assert {bitboard.action(bit) for bit in bitboard.moves(x, o)} == actions(board)
+        if not terminal(board):
+            bit = next(bitboard.moves(x, o))
+            assert bitboard.result(x, o, bit) == bitboard.from_board(result(board, bitboard.action(bit)))
+
+
+def test_bitboard_minimax_every_position():
+    table = tictactoe.transpositions[True]
+    for board in reachable():
+        action = bitboard.best_action(board)
+        if terminal(board):
+            assert action is None
+        else:
+            assert memo_value(result(board, action), table) == memo_value(board, table)
+
+
+def test_bitboard_invalid_move():
+    x, o = bitboard.from_board(board_from(["X--", "---", "---"]))
+    with pytest.raises(ValueError):
+        bitboard.result(x, o, 1)
+    with pytest.raises(ValueError):
+        bitboard.result(x, o, 1 << 9)
+
+
+def test_book_matches_search():
+    table = tictactoe.transpositions[True]
+    for board in reachable():
+        value, best_actions = book.lookup(board)
+        assert value == memo_value(board, table)
+        if terminal(board):
+            assert best_actions == [] and minimax(board) is None
+        else:
+            assert set(best_actions) == {
+                action for action in actions(board) if memo_value(result(board, action), table) == value
+            }
+            assert minimax(board) in best_actions
+    assert book.lookup(board_from(["XXX", "XXX", "---"])) is None
+
+
+def test_book_fallback(tmp_path, monkeypatch):
+    board = board_from(["XX-", "-O-", "--O"])
+    assert book.load(str(tmp_path / "missing.bin")) is None
+
+    stale = tmp_path / "stale.bin"
+    book.generate(str(stale))
+    assert book.load(str(stale)) is not None
+    data = bytearray(stale.read_bytes())
+    data[len(book.MAGIC)] ^= 1
+    stale.write_bytes(bytes(data))
+    assert book.load(str(stale)) is None
+
+    monkeypatch.setattr(book, "_table", False)
+    assert book.lookup(board) is None
+    assert memo_value(result(board, minimax(board)), tictactoe.transpositions[True]) == 1
+
+
+def test_general_boards():
+    board = initial_state(4, 5)
+    assert len(board) == 4 and all(row == [EMPTY] * 5 for row in board)
+    with pytest.raises(Exception):
+        result(board, (4, 0))
+    with pytest.raises(Exception):
+        result(board, (0, 5))
+
+    board = board_from(["X---", "OX--", "O-X-", "----"])
+    assert utility(board, k=3) == 1 and winner(board, k=3) == X and terminal(board, k=3)
+    assert utility(board, k=4) == 0 and not terminal(board, k=4)
+    assert line_winner(board_from(["---O", "--O-", "-O--", "----"]), 3) == O
+
+    for board in reachable():
+        assert {X: 1, O: -1}.get(line_winner(board, 3), 0) == utility(board)
+
+
+def test_position_is_incremental():
+    rng = random.Random(1)
+    for _ in range(20):
+        board = initial_state(6, 7)
+        position = mnk.Position(6, 7, 4)
+        while not terminal(board, k=4):
+            i, j = rng.choice(sorted(actions(board)))
+            board = result(board, (i, j))
+            position.play(i * 7 + j)
+            fresh = mnk.Position.from_board(board, 4)
+            assert position.score == fresh.score
+            assert position.turn == fresh.turn
+            assert {mnk.X_STONE: X, mnk.O_STONE: O}.get(position.winner) == line_winner(board, 4)
+        while position.history:
+            position.undo()
+        assert position.score == 0 and not position.winner and not any(position.cells)
+
+
+def test_best_move_small_boards_is_exact():
+    table = tictactoe.transpositions[True]
+    for board in POSITIONS:
+        action = mnk.best_move(board, 3, time_limit=None)
+        assert memo_value(result(board, action), table) == memo_value(board, table)
+    # 3 in a row on 4x4 is a first-player win, forced five plies deep
+    stats = {}
+    action = mnk.best_move(initial_state(4, 4), 3, time_limit=None, stats=stats)
+    assert action in [(1, 1), (1, 2), (2, 1), (2, 2)]
+    assert stats["depth"] == 5
+
+
+def test_best_move_gomoku():
+    board = initial_state(15, 15)
+    for action in [(7, 7), (0, 0), (7, 8), (0, 2), (7, 9), (0, 4), (7, 10)]:
+        board = result(board, action)
+    stats = {}
+    # O must block one end of the open four and cannot stop the other,
+    # which the search proves without going past two plies
+    assert mnk.best_move(board, 5, time_limit=None, max_depth=4, stats=stats) in [(7, 6), (7, 11)]
+    assert stats["depth"] == 2
+    board = result(board, (14, 14))
+    assert minimax(board, k=5, time_limit=None) in [(7, 6), (7, 11)]
+    assert mnk.best_move(initial_state(15, 15), 5) == (7, 7)
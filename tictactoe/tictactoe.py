@@ -4,18 +4,44 @@ Tic Tac Toe Player
 
 import math
 
+import book
+import mnk
+
 X = "X"
 O = "O"
 EMPTY = None
 
-
-def initial_state():
+# The 8 rotations and reflections of the board, each as the cell (row
+# major, 0-8) that moves to position 0, 1, ... 8
+SYMMETRIES = [
+    tuple(3 * i + j for i, j in cells)
+    for transform in (
+        lambda i, j: (i, j),
+        lambda i, j: (j, 2 - i),
+        lambda i, j: (2 - i, 2 - j),
+        lambda i, j: (2 - j, i),
+        lambda i, j: (i, 2 - j),
+        lambda i, j: (j, i),
+        lambda i, j: (2 - i, j),
+        lambda i, j: (2 - j, 2 - i),
+    )
+    for cells in [[transform(i, j) for i in range(3) for j in range(3)]]
+]
+
+# Order in which alpha-beta tries moves: the center, then the corners,
+# then the edges, which are on 4, 3 and 2 lines respectively
+MOVE_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Values of the positions searched so far, keyed by `board_key`, one
+# table without and one with symmetry canonicalisation
+transpositions = {False: {}, True: {}}
+
+
+def initial_state(m=3, n=3):
     """
-    Returns starting state of the board.
+    Returns starting state of the board, 3x3 unless an m x n board is asked for.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * n for _ in range(m)]
 
 
 def player(board):
@@ -76,7 +102,7 @@ def result(board, action):
     # copying the board so it doesnt cause main board to change
 
     # raises exception if move already taken or the value is out of bound
-    if new_board[i][j] != EMPTY or (i > 2 or i < 0) or (j > 2 or j < 0):
+    if (i >= len(board) or i < 0) or (j >= len(board[0]) or j < 0) or new_board[i][j] != EMPTY:
         raise Exception
     else:
         new_board[i][j] = p
@@ -84,12 +110,12 @@ def result(board, action):
     return new_board
 
 
-def winner(board):
+def winner(board, k=3):
     """
     Returns the winner of the game, if there is one.
     """
 
-    val = utility(board)  # to get the value 1,0,-1
+    val = utility(board, k)  # to get the value 1,0,-1
 
     if val == 1:
         return X
@@ -99,7 +125,7 @@ def winner(board):
         return None
 
 
-def terminal(board):
+def terminal(board, k=3):
     """
     Returns True if game is over, False otherwise.
     """
@@ -110,19 +136,25 @@ def terminal(board):
             if j == X or j == O:
                 counter += 1
 
-    if counter == 9:
+    if counter == len(board) * len(board[0]):
         return True
-    elif utility(board) != 0:
+    elif utility(board, k) != 0:
         return True
     else:
         return False
 
 
-def utility(board):
+def utility(board, k=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+
+    A game is won with `k` in a row; boards other than 3x3 with k = 3
+    are checked with `line_winner`.
     """
 
+    if k != 3 or len(board) != 3 or len(board[0]) != 3:
+        return {X: 1, O: -1}.get(line_winner(board, k), 0)
+
     winner = EMPTY
 
     # for rows
@@ -148,9 +180,34 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def minimax(board, k=3, time_limit=mnk.TIME_LIMIT):
     """
     Returns the optimal action for the current player on the board.
+
+    The move is read from the precomputed solution table (see `book`)
+    when there is one. Otherwise positions are looked up in a
+    transposition table (see `memo_minimax`), so only the first search
+    from a position does any work.
+
+    Other board sizes, or k other than 3, are searched by `mnk.best_move`
+    for at most `time_limit` seconds.
+    """
+
+    if len(board) != 3 or len(board[0]) != 3 or k != 3:
+        return mnk.best_move(board, k, time_limit)
+    if terminal(board):
+        return None
+    solved = book.lookup(board)
+    if solved is not None:
+        value, best_actions = solved
+        return min(best_actions, key=MOVE_ORDER.index)
+    return memo_minimax(board)
+
+
+def exhaustive_minimax(board):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the whole game tree below it.
     """
 
     if terminal(board):  # if the board is already complete then we return none
@@ -210,3 +267,167 @@ def minimax2(board):  # inner layer
             actions_dict[action] = value
         best_move = min(actions_dict, key=actions_dict.get)
         return actions_dict[best_move]
+
+
+def board_key(board):
+    """
+    Returns the board as an immutable 9-character string, row by row,
+    with "-" for empty cells.
+    """
+    return "".join(cell or "-" for row in board for cell in row)
+
+
+def canonical_key(key):
+    """
+    Returns the smallest of the 8 rotations and reflections of a
+    `board_key`, which is the same for every symmetric position.
+    """
+    return min("".join(key[cell] for cell in symmetry) for symmetry in SYMMETRIES)
+
+
+def memo_minimax(board, symmetry=True, stats=None):
+    """
+    Returns the same optimal action as `exhaustive_minimax`, storing
+    the value of every position searched in `transpositions`.
+
+    The full game tree has about 550,000 nodes but only 5,478 distinct
+    positions, so each position is searched once, ever, and reached
+    again through another move order it is a table hit. With `symmetry`
+    positions are keyed by `canonical_key`, which folds the table to
+    the 765 essentially different positions.
+
+    If `stats` is a dictionary, the positions looked up and searched,
+    the table hits, the hit rate and the table size are stored in it.
+    """
+
+    if terminal(board):
+        return None
+
+    table = transpositions[symmetry]
+    counts = {"lookups": 0, "searched": 0}
+    values = {
+        action: memo_value(result(board, action), table, symmetry, counts)
+        for action in actions(board)
+    }
+
+    if stats is not None:
+        hits = counts["lookups"] - counts["searched"]
+        stats.update(counts, hits=hits, hit_rate=hits / counts["lookups"], table_size=len(table))
+
+    if player(board) == X:
+        return max(values, key=values.get)
+    else:
+        return min(values, key=values.get)
+
+
+def memo_value(board, table, symmetry=True, counts=None):
+    """
+    Returns the minimax value of `board`, from `table` if it is there
+    and by searching its moves, through the table, otherwise.
+    """
+
+    key = board_key(board)
+    if symmetry:
+        key = canonical_key(key)
+    if counts is not None:
+        counts["lookups"] += 1
+    if key in table:
+        return table[key]
+    if counts is not None:
+        counts["searched"] += 1
+
+    if terminal(board):
+        value = utility(board)
+    else:
+        values = [memo_value(result(board, action), table, symmetry, counts) for action in actions(board)]
+        value = max(values) if player(board) == X else min(values)
+    table[key] = value
+    return value
+
+
+def ordered_actions(board):
+    """
+    Returns the actions available on the board in `MOVE_ORDER`.
+    """
+    return [(i, j) for i, j in MOVE_ORDER if board[i][j] == EMPTY]
+
+
+def alphabeta_minimax(board, stats=None):
+    """
+    Returns an optimal action for the current player on the board, with
+    the same value as the one `exhaustive_minimax` returns, found by
+    alpha-beta search.
+
+    Moves are tried in `MOVE_ORDER`, so a strong move is usually searched
+    first and its value cuts off most of the remaining moves early. If
+    `stats` is a dictionary, the number of positions searched is stored
+    in it under "nodes".
+    """
+
+    if terminal(board):
+        return None
+
+    counts = {"nodes": 1}
+    maximizing = player(board) == X
+    alpha, beta = -math.inf, math.inf
+    best_action = None
+    for action in ordered_actions(board):
+        value = alphabeta(result(board, action), alpha, beta, counts)
+        if maximizing and value > alpha:
+            alpha, best_action = value, action
+        elif not maximizing and value < beta:
+            beta, best_action = value, action
+        if alpha >= 1 or beta <= -1:
+            break
+
+    if stats is not None:
+        stats["nodes"] = counts["nodes"]
+    return best_action
+
+
+def alphabeta(board, alpha, beta, counts=None):
+    """
+    Returns the minimax value of `board` if it lies between `alpha` and
+    `beta`, and otherwise a bound beyond the one it falls outside of.
+    """
+
+    if counts is not None:
+        counts["nodes"] += 1
+    if terminal(board):
+        return utility(board)
+
+    if player(board) == X:
+        value = -math.inf
+        for action in ordered_actions(board):
+            value = max(value, alphabeta(result(board, action), alpha, beta, counts))
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+    else:
+        value = math.inf
+        for action in ordered_actions(board):
+            value = min(value, alphabeta(result(board, action), alpha, beta, counts))
+            beta = min(beta, value)
+            if alpha >= beta:
+                break
+    return value
+
+
+def line_winner(board, k):
+    """
+    Returns the player with `k` in a row, column or diagonal on a board
+    of any size, or None.
+    """
+    m, n = len(board), len(board[0])
+    for i in range(m):
+        for j in range(n):
+            cell = board[i][j]
+            if cell is EMPTY:
+                continue
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                if 0 <= end_i < m and 0 <= end_j < n and all(
+                    board[i + di * step][j + dj * step] == cell for step in range(1, k)
+                ):
+                    return cell
+    return None